@@ -1,41 +1,74 @@
-import pandas as pd
-from win10toast import ToastNotifier
+import xlsxwriter
 import os
+import queue
+import threading
+import functools
+from typing import Any, Dict, Iterable
 
-def export_sys2_requirements():
+# Static export content and location, built once at import
+_HEADERS = ('SYS.2 Req. ID', 'SYS.2 System Requirement')
+_DEFAULT_RECORDS = (
+    {'SYS.2 Req. ID': 'SYS.2.1', 'SYS.2 System Requirement': 'Sample System Requirement 1'},
+    {'SYS.2 Req. ID': 'SYS.2.2', 'SYS.2 System Requirement': 'Sample System Requirement 2'}
+)
+_OUTPUT_PATH = os.path.join('D:', 'AgentX', 'AutoTestGen_MAPS_Agents123', 'AutoTestGen_MAPS', 'Inputs', 'sys2_requirements.xlsx')
+
+@functools.lru_cache(maxsize=1)
+def _ensure_output_dir():
+    """Create the output directory on the first export only"""
+    os.makedirs(os.path.dirname(_OUTPUT_PATH), exist_ok=True)
+
+# Toast notifications are opt-in; set ENABLE_TOASTS=1 to show them on Windows
+ENABLE_TOASTS = os.getenv('ENABLE_TOASTS', '').lower() in ('1', 'true', 'yes')
+
+_toast_queue = queue.Queue()
+_toast_worker_lock = threading.Lock()
+_toast_worker_started = False
+
+def _toast_worker():
+    """Show queued toasts one at a time from a single background thread"""
+    from win10toast import ToastNotifier
+    toaster = ToastNotifier()
+    while True:
+        title, message = _toast_queue.get()
+        try:
+            toaster.show_toast(title, message, duration=5, threaded=False)
+        except Exception as e:
+            print(f"[WARNING] Could not show toast notification: {e}")
+
+def _notify(title, message):
+    """Queue a toast notification without blocking the caller"""
+    global _toast_worker_started
+    if not ENABLE_TOASTS:
+        return
+    with _toast_worker_lock:
+        if not _toast_worker_started:
+            threading.Thread(target=_toast_worker, daemon=True).start()
+            _toast_worker_started = True
+    _toast_queue.put((title, message))
+
+def export_sys2_requirements(records: Iterable[Dict[str, Any]] = _DEFAULT_RECORDS):
+    """Export SYS.2 requirement records (any iterable, e.g. a generator) to sys2_requirements.xlsx"""
     try:
-        # Create DataFrame with only SYS.2 Req. ID and SYS.2 System Requirement columns
-        df = pd.DataFrame({
-            'SYS.2 Req. ID': ['SYS.2.1', 'SYS.2.2'],
-            'SYS.2 System Requirement': ['Sample System Requirement 1', 'Sample System Requirement 2']
-        })
-        
-        # Define the output path
-        output_path = os.path.join('D:', 'AgentX', 'AutoTestGen_MAPS_Agents123', 'AutoTestGen_MAPS', 'Inputs', 'sys2_requirements.xlsx')
-        
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        # Export to Excel
-        df.to_excel(output_path, index=False)
-        
+        output_path = _OUTPUT_PATH
+        _ensure_output_dir()
+
+        # Stream rows to Excel in constant-memory mode; each row is flushed as soon as it is written
+        workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+        worksheet = workbook.add_worksheet('Sheet1')
+        worksheet.write_row(0, 0, _HEADERS)
+        for row_num, record in enumerate(records, 1):
+            worksheet.write_row(row_num, 0, [record.get(header, '') for header in _HEADERS])
+        workbook.close()
+
         # Show toast notification
-        toaster = ToastNotifier()
-        toaster.show_toast(
+        _notify(
             "SYS.2 requirements and data generated successfully",
-            f"sys2_requirements.xlsx has been exported to {output_path}",
-            duration=5,
-            threaded=True
+            f"sys2_requirements.xlsx has been exported to {output_path}"
         )
-        
+
         return True
     except Exception as e:
         # Show error notification
-        toaster = ToastNotifier()
-        toaster.show_toast(
-            "Export Failed",
-            f"Error exporting file: {str(e)}",
-            duration=5,
-            threaded=True
-        )
-        return False 
\ No newline at end of file
+        _notify("Export Failed", f"Error exporting file: {str(e)}")
+        return False
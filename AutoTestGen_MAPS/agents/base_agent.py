@@ -2,6 +2,8 @@ from abc import ABC, abstractmethod
 from typing import Dict, List, Any
 import logging
 
+_LOGGING_CONFIGURED = False
+
 class BaseAgent(ABC):
     """Base class for all requirement engineering agents"""
     
@@ -15,6 +17,13 @@ class BaseAgent(ABC):
     def setup_logging(self):
         """Configure logging for the agent - default basic configuration"""
         # This basic config will be used if derived class doesn't override or calls super().setup_logging
+        # Root logging is configured once per process, not once per agent instance
+        global _LOGGING_CONFIGURED
+        if _LOGGING_CONFIGURED:
+            return
+        _LOGGING_CONFIGURED = True
+        if logging.getLogger().handlers:
+            return
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -41,11 +50,3 @@ class BaseAgent(ABC):
     def update_config(self, key: str, value: Any):
         """Update configuration value"""
         self.config[key] = value
-
-    def setup_logging(self):
-        """Configure logging for the agent - default basic configuration"""
-        # This basic config will be used if derived class doesn't override or calls super().setup_logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        ) 
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""Shared Excel reading helpers for the agents"""
+import os
+import openpyxl
+import pandas as pd
+from typing import BinaryIO, Optional, Union
+
+def _calamine_value(value):
+    """Normalize a python-calamine cell like pandas' calamine engine: empty cells become None and integral
+    floats become ints (calamine reads every number as a float, so an ID cell of 101 would read as 101.0)"""
+    if value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def iter_excel_rows(file_path: Union[str, BinaryIO], file_name: Optional[str] = None):
+    """Yield the rows (header first) of the first sheet of an Excel file as tuples, with empty cells as None.
+
+    file_path may also be a seekable binary file object (e.g. an upload stream), in which case file_name
+    is the original file name, used to recognise legacy .xls workbooks.
+
+    The parser is chosen with the WHALE_XLSX_ENGINE environment variable: 'calamine' (default) uses the
+    Rust-based python-calamine reader when it is installed, otherwise openpyxl read-only mode is used.
+    """
+    is_path = isinstance(file_path, str)
+    if file_name is None:
+        file_name = file_path if is_path else ''
+    engine = os.getenv('WHALE_XLSX_ENGINE', 'calamine').lower()
+    if engine == 'calamine':
+        try:
+            from python_calamine import CalamineWorkbook
+        except ImportError:
+            CalamineWorkbook = None
+        if CalamineWorkbook is not None:
+            if is_path:
+                workbook = CalamineWorkbook.from_path(file_path)
+            else:
+                workbook = CalamineWorkbook.from_filelike(file_path)
+            sheet = workbook.get_sheet_by_index(0)
+            for row in sheet.to_python():
+                yield tuple(_calamine_value(value) for value in row)
+            return
+
+    if file_name.lower().endswith('.xls'):
+        # openpyxl cannot read legacy .xls workbooks; fall back to pandas for those
+        df = pd.read_excel(file_path)
+        yield tuple(df.columns)
+        yield from df.astype(object).where(pd.notnull(df), None).itertuples(index=False, name=None)
+        return
+
+    # Stream the sheet in read-only mode instead of materializing the whole workbook
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
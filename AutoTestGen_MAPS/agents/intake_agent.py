@@ -1,25 +1,59 @@
 from typing import Dict, List, Any
 from .base_agent import BaseAgent
 import spacy
+from spacy.symbols import VERB
 from transformers import pipeline
-import pandas as pd
+from datetime import datetime
 import json
+import os
 # Import uuid to generate unique IDs
 import uuid
+import functools
+import threading
+import re
+
+# Keyword patterns for domain classification and priority assignment, compiled once at import.
+# Keywords match whole words (domain nouns also in the plural), not substrings of other words
+_SOFTWARE_RE = re.compile(r"\b(?:software|code|algorithm|api|database|interface|ui|ux)s?\b", re.I)
+_HARDWARE_RE = re.compile(r"\b(?:hardware|chip|processor|memory|board|electronic|circuit)s?\b", re.I)
+_MECHANICAL_RE = re.compile(r"\b(?:mechanical|chassis|structure|bolt|screw|material|assembly)s?\b", re.I)
+_HIGH_PRIORITY_RE = re.compile(r"\b(?:must|shall|critical|safety)\b", re.I)
+_MEDIUM_PRIORITY_RE = re.compile(r"\b(?:should|important)\b", re.I)
+_LOW_PRIORITY_RE = re.compile(r"\b(?:could|nice to have|optional)\b", re.I)
+
+# Action phrases extracted per customer requirement text, reused when the same text is seen again
+_ACTION_PHRASE_CACHE: Dict[str, str] = {}
+_ACTION_PHRASE_CACHE_SIZE = 4096
+# Uploads run on several request and background job threads; eviction and insertion happen under this lock
+_ACTION_PHRASE_CACHE_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _get_nlp():
+    """Load the spaCy model once per process and share it across agent instances"""
+    return spacy.load("en_core_web_sm", disable=["ner", "lemmatizer"])
+
+@functools.lru_cache(maxsize=1)
+def _get_classifier():
+    """Load the text classification pipeline once per process"""
+    return pipeline("text-classification")
 
 class ElicitationAgent(BaseAgent):
     """Agent 1: Requirement Elicitation and SYS.1 Drafting"""
     
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
-        self.nlp = spacy.load("en_core_web_sm")
-        self.classifier = pipeline("text-classification")
+        self.nlp = _get_nlp()
+        self.classifier = _get_classifier()
         self.setup_pipelines()
     
     def setup_pipelines(self):
         """Initialize NLP pipelines and models"""
         # Add custom pipeline components here
-        pass
+        # Cache dependency label IDs so token.dep (int) can be compared instead of token.dep_ (str)
+        strings = self.nlp.vocab.strings
+        self._prep_dep = strings["prep"]
+        self._action_child_deps = frozenset(strings[label] for label in ("dobj", "nobj", "advmod"))
+        self._prep_object_deps = frozenset(strings[label] for label in ("pobj", "dobj", "nsubj", "attr", "compound"))
     
     def process(self, input_data: Any) -> Dict[str, Any]:
         """Process input data and generate SYS.1 requirements"""
@@ -27,11 +61,11 @@ class ElicitationAgent(BaseAgent):
             # Extract text from various input formats
             text_content = self._extract_text(input_data)
             
-            # Process text with NLP
-            doc = self.nlp(text_content)
+            # Split into non-empty lines once; NLP is only run later on the requirement texts
+            lines = [line.strip() for line in text_content.split('\n') if line.strip()]
             
             # Extract raw customer requirements
-            customer_requirements = self._extract_customer_requirements(doc)
+            customer_requirements = self._extract_customer_requirements(lines)
             
             # Generate SYS.1 requirements and establish traceability
             # This method will now generate multiple SYS.1 per customer requirement
@@ -53,7 +87,7 @@ class ElicitationAgent(BaseAgent):
                 'sys1_requirements': sys1_requirements,
                 'metadata': {
                     'source': input_data.get('source', 'unknown'),
-                    'timestamp': pd.Timestamp.now().isoformat()
+                    'timestamp': datetime.now().isoformat()
                 }
             }
         except Exception as e:
@@ -70,11 +104,10 @@ class ElicitationAgent(BaseAgent):
         # Implement format-specific extraction logic
         return input_data.get('content', '')
     
-    def _extract_customer_requirements(self, doc) -> List[Dict[str, Any]]:
-        """Extract raw customer requirements from text."""
+    def _extract_customer_requirements(self, lines: List[str]) -> List[Dict[str, Any]]:
+        """Extract raw customer requirements from the stripped, non-empty input lines."""
         customer_requirements = []
-        # Split by newlines for robust extraction of individual customer requirements
-        lines = [line.strip() for line in doc.text.split('\n') if line.strip()]
+        # Each line is one customer requirement
         for i, line in enumerate(lines, 1):
             cust_id = f'CUST_REQ-{i:03d}'
             # Extract the requirement text, removing potential prefix
@@ -98,9 +131,29 @@ class ElicitationAgent(BaseAgent):
         sys1_requirements = []
         sys1_counter = 1
 
-        for cust_req in customer_requirements:
+        # Only customer requirements with text need NLP; parse each distinct, not yet cached text once in a batch
+        valid_cust_reqs = [c for c in customer_requirements if c.get('customer_requirement', '')]
+        texts = list(dict.fromkeys(
+            c['customer_requirement'] for c in valid_cust_reqs
+            if c['customer_requirement'] not in _ACTION_PHRASE_CACHE
+        ))
+        docs = self.nlp.pipe(
+            texts,
+            batch_size=64,
+            disable=["ner", "lemmatizer"],
+            n_process=int(os.getenv('SPACY_N_PROCESS', '1'))
+        )
+        for text, doc in zip(texts, docs):
+            action_phrase = self._extract_action_phrase(doc, text)
+            with _ACTION_PHRASE_CACHE_LOCK:
+                if len(_ACTION_PHRASE_CACHE) >= _ACTION_PHRASE_CACHE_SIZE:
+                    # Evict the oldest entry
+                    _ACTION_PHRASE_CACHE.pop(next(iter(_ACTION_PHRASE_CACHE)), None)
+                _ACTION_PHRASE_CACHE[text] = action_phrase
+
+        for cust_req in valid_cust_reqs:
             customer_id = cust_req.get('customer_id', '')
-            customer_text = cust_req.get('customer_requirement', '')
+            customer_text = cust_req['customer_requirement']
 
             if customer_text:
                 # --- One-to-Many Generation Logic (Placeholder) ---
@@ -109,37 +162,13 @@ class ElicitationAgent(BaseAgent):
                 num_sys1 = 1 # Simple case: 1 SYS.1 per customer requirement
                 # num_sys1 = 2 # Example: generate 2 SYS.1s per customer requirement
 
+                # The action phrase is a pure function of the text, shared by all SYS.1s of this customer requirement
+                action_phrase = _ACTION_PHRASE_CACHE.get(customer_text)
+                if action_phrase is None:
+                    action_phrase = self._extract_action_phrase(self.nlp(customer_text), customer_text)
+
                 for i in range(num_sys1):
                     sys1_id = f'SYS.1-{sys1_counter:03d}'
-                    # Use spaCy to extract a more complete action phrase
-                    doc = self.nlp(customer_text)
-                    action_phrase_parts = []
-                    root_verb = None
-
-                    # Find the root verb
-                    for token in doc:
-                        if token.dep_ == "ROOT" and token.pos_ == "VERB":
-                            root_verb = token
-                            break
-
-                    if root_verb:
-                        # Start action phrase with the root verb
-                        action_phrase_parts.append(root_verb.text)
-                        # Add key dependents: direct objects, nominal objects, and relevant adverbs/prepositions
-                        for child in root_verb.children:
-                            if child.dep_ in ["dobj", "nobj", "advmod"] or (child.dep_ == "prep" and len(list(child.children)) > 0): # Include prep with children
-                                action_phrase_parts.append(child.text)
-                                # For prepositions, also try to include their objects
-                                if child.dep_ == "prep":
-                                    for grand_child in child.children:
-                                        if grand_child.dep_ in ["pobj", "dobj", "nsubj", "attr", "compound"]:
-                                            action_phrase_parts.append(grand_child.text)
-
-                        # Join parts to form the action phrase
-                        action_phrase = " ".join(action_phrase_parts)
-                    else:
-                        # Fallback if no root verb is found
-                        action_phrase = f"implement the capability to {customer_text.lower()}"
 
                     # Construct the SYS.1 requirement text
                     # Keep the original customer text for context, but prioritize the extracted action
@@ -160,22 +189,48 @@ class ElicitationAgent(BaseAgent):
 
         # Pad SYS.1 requirements if necessary to meet a minimum count for the table
         min_sys1_count = 10 # Example minimum
-        while len(sys1_requirements) < min_sys1_count:
-             sys1_id = f'SYS.1-{sys1_counter:03d}'
-             sys1_requirements.append({
-                 'sys1_id': sys1_id,
-                 'sys1_requirement': '',
-                 'customer_trace_ids': [], # No trace for padded requirements
-                 'domain': '',
-                 'priority': '',
-                 'req_status': 'Draft',
-                 'rationale': ''
-             })
-             sys1_counter += 1
+        needed = min_sys1_count - len(sys1_requirements)
+        if needed > 0:
+            sys1_requirements.extend({
+                'sys1_id': f'SYS.1-{sys1_counter + i:03d}',
+                'sys1_requirement': '',
+                'customer_trace_ids': [], # No trace for padded requirements
+                'domain': '',
+                'priority': '',
+                'req_status': 'Draft',
+                'rationale': ''
+            } for i in range(needed))
+            sys1_counter += needed
 
 
         return sys1_requirements
     
+    def _extract_action_phrase(self, doc, customer_text: str) -> str:
+        """Extract the action phrase (root verb and key dependents) used to word a SYS.1 requirement."""
+        action_phrase_parts = []
+        # Find the root verb (the first sentence root that is a verb)
+        root_verb = next((sent.root for sent in doc.sents if sent.root.pos == VERB), None)
+
+        if root_verb:
+            # Start action phrase with the root verb
+            action_phrase_parts.append(root_verb.text)
+            # Add key dependents: direct objects, nominal objects, and relevant adverbs/prepositions
+            for child in root_verb.children:
+                child_dep = child.dep
+                is_prep = child_dep == self._prep_dep
+                if child_dep in self._action_child_deps or (is_prep and child.n_rights + child.n_lefts > 0): # Include prep with children
+                    action_phrase_parts.append(child.text)
+                    # For prepositions, also try to include their objects
+                    if is_prep:
+                        for grand_child in child.children:
+                            if grand_child.dep in self._prep_object_deps:
+                                action_phrase_parts.append(grand_child.text)
+
+            # Join parts to form the action phrase
+            return " ".join(action_phrase_parts)
+        # Fallback if no root verb is found
+        return f"implement the capability to {customer_text.lower()}"
+    
     def _analyze_feasibility(self, requirements: List[Dict[str, Any]]) -> Dict[str, float]:
         """Analyze feasibility of requirements (currently a placeholder)."""
         feasibility_scores = {}
@@ -184,26 +239,24 @@ class ElicitationAgent(BaseAgent):
     
     def _classify_domain(self, requirement_text: str) -> str:
         """Classify the domain of a requirement based on keywords."""
-        text = requirement_text.lower()
         # Simple keyword-based classification
-        if any(keyword in text for keyword in ['software', 'code', 'algorithm', 'api', 'database', 'interface', 'ui', 'ux']):
+        if _SOFTWARE_RE.search(requirement_text):
             return 'Software'
-        elif any(keyword in text for keyword in ['hardware', 'chip', 'processor', 'memory', 'board', 'electronic', 'circuit']):
+        elif _HARDWARE_RE.search(requirement_text):
             return 'Hardware'
-        elif any(keyword in text for keyword in ['mechanical', 'chassis', 'structure', 'bolt', 'screw', 'material', 'assembly']):
+        elif _MECHANICAL_RE.search(requirement_text):
             return 'Mechanical'
         else:
             return 'System' # Default domain
     
     def _assign_priority(self, requirement_text: str) -> str:
         """Assign a priority to a requirement based on keywords or analysis."""
-        text = requirement_text.lower()
         # Simple keyword-based priority assignment (can be expanded)
-        if any(keyword in text for keyword in ['must', 'shall', 'critical', 'safety']):
+        if _HIGH_PRIORITY_RE.search(requirement_text):
             return 'High'
-        elif any(keyword in text for keyword in ['should', 'important']):
+        elif _MEDIUM_PRIORITY_RE.search(requirement_text):
             return 'Medium'
-        elif any(keyword in text for keyword in ['could', 'nice to have', 'optional']):
+        elif _LOW_PRIORITY_RE.search(requirement_text):
             return 'Low'
         else:
             return 'Medium' # Default priority 
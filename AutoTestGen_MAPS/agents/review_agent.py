@@ -1,28 +1,142 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, BinaryIO, Union
 from .base_agent import BaseAgent
+from .excel_io import iter_excel_rows
 import spacy
-from transformers import pipeline
 import pandas as pd
 import json
 import uuid
 import traceback
-import openpyxl
+import xlsxwriter
 import os
+import re
+import functools
+import threading
+
+# Phrases indicating verification/testability and examples of quantifiable terms
+_VERIFICATION_PHRASES = frozenset(['shall be tested', 'shall be verified', 'can be measured', 'is measurable', 'can be quantified'])
+_QUANTIFIABLE_TERMS = frozenset(['seconds', 'milliseconds', '%', 'kbps', 'mbps'])
+# Union regexes per category, compiled once and matched case-insensitively (no lowercased copy of the text)
+# Verification phrases must stand as whole words; units may be attached to a number (e.g. "100kbps")
+_VERIFICATION_RE = re.compile(r'\b(?:' + '|'.join(re.escape(phrase) for phrase in sorted(_VERIFICATION_PHRASES)) + r')\b', re.IGNORECASE)
+_QUANTIFIABLE_RE = re.compile('|'.join(re.escape(term) for term in sorted(_QUANTIFIABLE_TERMS)), re.IGNORECASE)
+# Vague terms and potentially ambiguous pronouns, matched against a requirement's lowercased tokens
+_VAGUE_TERMS = frozenset(['flexible', 'efficient', 'robust', 'appropriate', 'adequate'])
+_AMBIGUOUS_PRONOUNS = frozenset(['it', 'this', 'they'])
+
+# Per-text review results, reused when the same requirement text is reviewed again
+_COMPLIANCE_CACHE: Dict[str, Any] = {}
+_LINGUISTIC_CACHE: Dict[str, Any] = {}
+_REVIEW_CACHE_SIZE = 4096
+# The caches are shared by request and background job threads; all writes go through _cache_put under this lock
+_REVIEW_CACHE_LOCK = threading.Lock()
+
+def _cache_put(cache: Dict[str, Any], key: str, value: Any):
+    """Store a value in one of the bounded review caches, evicting the oldest entry when full"""
+    with _REVIEW_CACHE_LOCK:
+        if len(cache) >= _REVIEW_CACHE_SIZE:
+            cache.pop(next(iter(cache)), None)
+        cache[key] = value
+
+# Compliance categories scanned in one pass when the Hyperscan engine is enabled (database id -> regex)
+_PHRASE_CATEGORY_PATTERNS = (_VERIFICATION_RE.pattern, _QUANTIFIABLE_RE.pattern)
+_VERIFICATION_ID, _QUANTIFIABLE_ID = range(len(_PHRASE_CATEGORY_PATTERNS))
+
+def _unpack_requirements(requirements: List[Dict[str, Any]]):
+    """Split requirements into parallel lists of IDs and texts, so each dict is only read once per analysis"""
+    req_ids = []
+    texts = []
+    for req in requirements:
+        get = req.get
+        req_ids.append(get('sys2_id') or get('id') or 'Unknown_ID')
+        texts.append(get('sys2_requirement') or get('content') or '')
+    return req_ids, texts
+
+@functools.lru_cache(maxsize=1)
+def _get_phrase_db():
+    """Compile the compliance phrase patterns into one Hyperscan block-mode database.
+
+    Only used when WHALE_PHRASE_ENGINE is set to 'hyperscan' and the hyperscan package is installed;
+    returns None otherwise, in which case the compiled `re` patterns are used.
+    """
+    if os.getenv('WHALE_PHRASE_ENGINE', 're').lower() != 'hyperscan':
+        return None
+    try:
+        import hyperscan
+    except ImportError:
+        print("[WARNING] WHALE_PHRASE_ENGINE=hyperscan but the hyperscan package is not installed; using re")
+        return None
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[pattern.encode('utf-8') for pattern in _PHRASE_CATEGORY_PATTERNS],
+        ids=list(range(len(_PHRASE_CATEGORY_PATTERNS))),
+        elements=len(_PHRASE_CATEGORY_PATTERNS),
+        flags=[flags] * len(_PHRASE_CATEGORY_PATTERNS)
+    )
+    return db
+
+def _scan_phrase_categories(db, text: str):
+    """Scan a text once with the Hyperscan database and return the ids of the categories that matched"""
+    hits = set()
+    db.scan(text.encode('utf-8'), match_event_handler=lambda id_, start, end, flags, context: hits.add(id_))
+    return hits
+
+@functools.lru_cache(maxsize=1)
+def _get_nlp():
+    """Load the spaCy model once per process and share it across ReviewAgent instances"""
+    # Do not pickle the returned model into worker processes; each process should load its own copy
+    # Only tokenization is used by the review checks, so unused components are not even constructed
+    return spacy.load("en_core_web_sm", exclude=["ner", "parser", "attribute_ruler", "lemmatizer"])
+
+@functools.lru_cache(maxsize=1)
+def _get_classifier():
+    """Load the text classification pipeline once per process"""
+    # Imported here so transformers/PyTorch are only loaded when the classifier is actually used
+    from transformers import pipeline
+    return pipeline("text-classification")
 
 class ReviewAgent(BaseAgent):
     """Agent 3: SYS.2 Review, Compliance & Continuous Learning"""
     
+    # Fields every reviewed requirement carries, with the value used when the input does not provide one
+    REVIEW_DEFAULTS = {
+        'sys1_id': 'N/A',
+        'sys1_requirement': 'N/A',
+        'sys2_requirement': 'N/A',
+        'type': 'N/A',
+        'verification_mapping': 'N/A',
+        'domain': 'N/A',
+        'priority': 'N/A',
+        'rationale': 'N/A',
+        'req_status': 'Draft', # Default status
+        'suggestions': 'N/A' # Ensure suggestions is present
+    }
+
+    # Excel header and the requirement field it is filled from, for the accepted requirements export
+    EXPORT_COLUMNS = (
+        ('SYS.2 Req. ID', 'sys2_id'),
+        ('SYS.2 System Requirement', 'sys2_requirement')
+    )
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
-        self.nlp = spacy.load("en_core_web_sm")
-        self.classifier = pipeline("text-classification")
+        self.nlp = _get_nlp()
         self.compliance_rules = self._load_compliance_rules()
         self.setup_pipelines()
+        # Requirements read from Excel keyed by (path, mtime, size), so unchanged files are not parsed again
+        self._excel_cache: Dict[tuple, List[Dict[str, Any]]] = {}
     
+    @property
+    def classifier(self):
+        """Text classification pipeline, loaded on first access (none of the review checks need it)"""
+        return _get_classifier()
+
     def setup_pipelines(self):
         """Initialize NLP pipelines and models"""
         # Add custom pipeline components here
-        pass
+        # nlp.pipe tuning; agent config wins over the SPACY_BATCH_SIZE / SPACY_N_PROCESS environment variables
+        self.spacy_batch_size = int(self.get_config('spacy_batch_size', os.getenv('SPACY_BATCH_SIZE', '64')))
+        self.spacy_n_process = int(self.get_config('spacy_n_process', os.getenv('SPACY_N_PROCESS', '1')))
     
     def process(self, input_data: Any) -> Dict[str, Any]:
         """Process SYS.2 requirements for review and compliance"""
@@ -51,36 +165,23 @@ class ReviewAgent(BaseAgent):
             
             # Combine results with original requirements for table display
             reviewed_requirements = []
-            # Create dictionaries for easy lookup by sys2_id
-            compliance_lookup = {res['sys2_id']: res for res in compliance_results}
-            linguistic_lookup = {res['sys2_id']: res for res in linguistic_analysis_results}
-
-            for req in requirements_to_process:
-                req_id = req.get('sys2_id', req.get('id', 'Unknown_ID'))
-                combined_req = req.copy() # Start with the original requirement data
-
-                # Add compliance and linguistic analysis results
-                compliance_data = compliance_lookup.get(req_id, {})
-                linguistic_data = linguistic_lookup.get(req_id, {})
-
-                combined_req['is_verification_criteria_okay'] = compliance_data.get('is_verification_criteria_okay', 'N/A')
-                combined_req['testable'] = compliance_data.get('testable', 'N/A')
-                combined_req['ireb_compliant'] = compliance_data.get('ireb_compliant', 'N/A')
-                combined_req['unambiguity'] = linguistic_data.get('unambiguity', 'N/A')
-
-                # Ensure other expected fields are present, even if N/A, for table consistency
-                combined_req['sys1_id'] = combined_req.get('sys1_id', 'N/A')
-                combined_req['sys1_requirement'] = combined_req.get('sys1_requirement', 'N/A')
-                combined_req['sys2_requirement'] = combined_req.get('sys2_requirement', 'N/A')
-                combined_req['type'] = combined_req.get('type', 'N/A')
-                combined_req['verification_mapping'] = combined_req.get('verification_mapping', 'N/A')
-                combined_req['domain'] = combined_req.get('domain', 'N/A')
-                combined_req['priority'] = combined_req.get('priority', 'N/A')
-                combined_req['rationale'] = combined_req.get('rationale', 'N/A')
-                combined_req['req_status'] = combined_req.get('req_status', 'Draft') # Default status
-                combined_req['suggestions'] = combined_req.get('suggestions', 'N/A') # Ensure suggestions is present
+            accepted_requirements = [] # Collected in the same pass, for the Excel export
+            # Both analyses return one result per requirement in input order, so join them by position
+            for req, compliance_data, linguistic_data in zip(requirements_to_process, compliance_results, linguistic_analysis_results):
+                # Start from the defaults so expected fields are present, even if N/A, for table consistency,
+                # then overlay the original requirement data and the analysis results
+                combined_req = {
+                    **self.REVIEW_DEFAULTS,
+                    **req,
+                    'is_verification_criteria_okay': compliance_data['is_verification_criteria_okay'],
+                    'testable': compliance_data['testable'],
+                    'ireb_compliant': compliance_data['ireb_compliant'],
+                    'unambiguity': linguistic_data['unambiguity']
+                }
 
                 reviewed_requirements.append(combined_req)
+                if combined_req['req_status'] == 'Accepted':
+                    accepted_requirements.append(combined_req)
 
             # Generate suggestions based on the combined results (placeholder)
             suggestions = self._generate_suggestions(compliance_results, linguistic_analysis_results)
@@ -89,7 +190,6 @@ class ReviewAgent(BaseAgent):
             test_proposals = self._propose_test_cases(requirements_to_process)
             
             # Export accepted requirements to Excel
-            accepted_requirements = [req for req in reviewed_requirements if req.get('req_status') == 'Accepted']
             export_message = None
             if accepted_requirements:
                 self._export_accepted_requirements(accepted_requirements)
@@ -121,11 +221,26 @@ class ReviewAgent(BaseAgent):
         # This will need to be updated later to properly validate the actual input data structure
         return isinstance(data, dict)
     
-    def _read_requirements_from_excel(self, file_path: str) -> List[Dict[str, Any]]:
-         """Reads SYS.2 requirements from a specified Excel file."""
+    def _read_requirements_from_excel(self, file_path: Union[str, BinaryIO], file_name: str = None) -> List[Dict[str, Any]]:
+         """Reads SYS.2 requirements from a specified Excel file.
+
+         file_path may also be a binary file object such as an upload stream, with its original name in
+         file_name; those are parsed in place and not cached.
+         """
          requirements = []
+         is_path = isinstance(file_path, str)
+         if file_name is None:
+             file_name = file_path if is_path else 'uploaded file'
          try:
-             df = pd.read_excel(file_path)
+             cache_key = None
+             if is_path:
+                 stat = os.stat(file_path)
+                 cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+                 cached = self._excel_cache.get(cache_key)
+                 if cached is not None:
+                     print(f"[INFO] Using cached requirements ({len(cached)}) for unchanged file {file_path}")
+                     return list(cached)
+
              # Assuming the Excel file has columns like 'SYS.2 Req. ID', 'SYS.2 System Requirement', etc.
              # Map these column names to the internal keys used in the agent (e.g., sys2_id, sys2_requirement)
              # This mapping needs to be accurate based on your Excel file column headers
@@ -135,28 +250,46 @@ class ReviewAgent(BaseAgent):
                  'Verification Criteria': 'verification_criteria', # Map the Verification Criteria column
                  # Add other column mappings as needed
              }
-             
-             # Rename columns according to the mapping
-             df_renamed = df.rename(columns=column_mapping)
-
-             # Convert DataFrame rows to dictionaries
-             requirements = df_renamed.to_dict(orient='records')
 
-             print(f"[INFO] Successfully read {len(requirements)} requirements from {file_path}")
+             rows = iter_excel_rows(file_path, file_name)
+             header = next(rows, ())
+             # Rename columns according to the mapping (unnamed columns get pandas-style names)
+             columns = [
+                 column_mapping.get(name, name) if name is not None else f'Unnamed: {i}'
+                 for i, name in enumerate(header)
+             ]
+             width = len(columns)
+             for row in rows:
+                 # Skip completely empty rows
+                 if all(value is None for value in row):
+                     continue
+                 if len(row) < width:
+                     row = tuple(row) + (None,) * (width - len(row))
+                 # Convert the row to a dictionary
+                 requirements.append(dict(zip(columns, row)))
+
+             print(f"[INFO] Successfully read {len(requirements)} requirements from {file_name}")
 
              # Add an explicit check for empty requirements list after reading
              if not requirements:
-                 print(f"[WARNING] _read_requirements_from_excel read 0 requirements from {file_path}. Check file content and column mappings.")
+                 print(f"[WARNING] _read_requirements_from_excel read 0 requirements from {file_name}. Check file content and column mappings.")
                  # Raise a specific error if no requirements were read but no exception occurred
                  raise ValueError('No requirements extracted from the Excel file. Check file format and column headers.')
 
+             if cache_key is not None:
+                 # Keep only the latest version of each file
+                 for key in [key for key in self._excel_cache if key[0] == cache_key[0]]:
+                     del self._excel_cache[key]
+                 self._excel_cache[cache_key] = requirements
+                 requirements = list(requirements)
+
          except FileNotFoundError:
-             print(f"[ERROR] Excel file not found at {file_path}")
+             print(f"[ERROR] Excel file not found at {file_name}")
              # Depending on desired behavior, you might raise an exception or return an empty list
              traceback.print_exc()
              pass # Returning empty list on file not found for now
          except Exception as e:
-             print(f"[ERROR] Error reading Excel file {file_path}: {e}")
+             print(f"[ERROR] Error reading Excel file {file_name}: {e}")
              # Handle other potential errors during file reading
              traceback.print_exc()
              # Re-raise the exception to be caught by the calling function
@@ -192,82 +325,105 @@ class ReviewAgent(BaseAgent):
     
     def _check_compliance(self, requirements: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Check IREB compliance of requirements"""
-        checked_requirements = []
-        
-        for req in requirements:
-            req_id = req.get('sys2_id', req.get('id', 'Unknown_ID'))
-            req_text = req.get('sys2_requirement', req.get('content', ''))
+        req_ids, texts = _unpack_requirements(requirements)
 
-            # Enhanced check for Verification Criteria and Testability (basic implementation)
-            is_verification_criteria_okay_status = 'Fail' # Default to Fail
-            testable_status = 'Fail' # Default to Fail
-            ireb_compliant_status = 'Fail' # Default to Fail
+        # Only texts that have not been checked before need to be scanned
+        new_texts = list(dict.fromkeys(text for text in texts if text not in _COMPLIANCE_CACHE))
+        if new_texts and _get_phrase_db() is not None:
+            # One Hyperscan pass per text covers every category
+            for text in new_texts:
+                _cache_put(_COMPLIANCE_CACHE, text, self._check_compliance_uncached(text))
+        elif new_texts:
+            new_texts_series = pd.Series(new_texts, dtype=object)
 
+            # Enhanced check for Verification Criteria and Testability (basic implementation)
             # Check for phrases indicating verification/testability
-            verification_phrases = ['shall be tested', 'shall be verified', 'can be measured', 'is measurable', 'can be quantified']
-            
-            found_verification_phrase = any(phrase in req_text.lower() for phrase in verification_phrases)
-            
-            if found_verification_phrase:
-                is_verification_criteria_okay_status = 'Pass'
-                testable_status = 'Pass' # Assume testable if verification is mentioned (simplified)
-
-            # Further refine testability check (e.g., look for quantifiable terms if not already covered)
-            quantifiable_terms = ['seconds', 'milliseconds', '%', 'kbps', 'mbps'] # Examples of quantifiable terms
-            if testable_status == 'Fail' and any(term in req_text.lower() for term in quantifiable_terms):
-                 testable_status = 'Pass'
-
+            verification_ok = new_texts_series.str.contains(_VERIFICATION_RE, regex=True)
+            # Assume testable if verification is mentioned (simplified), otherwise look for quantifiable terms
+            testable = verification_ok | new_texts_series.str.contains(_QUANTIFIABLE_RE, regex=True)
             # Simplified IREB compliant check - can be expanded significantly
             # For now, consider it compliant if verification criteria is okay and testable
-            if is_verification_criteria_okay_status == 'Pass' and testable_status == 'Pass':
-                 ireb_compliant_status = 'Pass'
+            ireb_compliant = verification_ok & testable
+
+            for text, flags in zip(new_texts, zip(verification_ok.tolist(), testable.tolist(), ireb_compliant.tolist())):
+                _cache_put(_COMPLIANCE_CACHE, text, tuple('Pass' if flag else 'Fail' for flag in flags))
 
-            checked_requirements.append({
+        # Resolve each distinct text once, then build all rows in a single comprehension
+        statuses = {text: _COMPLIANCE_CACHE.get(text) or self._check_compliance_uncached(text) for text in dict.fromkeys(texts)}
+        return [
+            {
                 'sys2_id': req_id,
                 'is_verification_criteria_okay': is_verification_criteria_okay_status,
                 'testable': testable_status,
                 'ireb_compliant': ireb_compliant_status
-            })
-        
-        return checked_requirements
+            }
+            for req_id, (is_verification_criteria_okay_status, testable_status, ireb_compliant_status)
+            in zip(req_ids, map(statuses.__getitem__, texts))
+        ]
+
+    def _check_compliance_uncached(self, text: str):
+        """Compute the compliance statuses of a single text (used when it was evicted from the cache)."""
+        db = _get_phrase_db()
+        if db is not None:
+            hits = _scan_phrase_categories(db, text)
+            verification_ok = _VERIFICATION_ID in hits
+            testable = verification_ok or _QUANTIFIABLE_ID in hits
+        else:
+            verification_ok = _VERIFICATION_RE.search(text) is not None
+            testable = verification_ok or _QUANTIFIABLE_RE.search(text) is not None
+        return tuple('Pass' if flag else 'Fail' for flag in (verification_ok, testable, verification_ok and testable))
     
     def _analyze_linguistics(self, requirements: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Perform linguistic analysis of requirements"""
-        analyzed_requirements = []
-        
-        for req in requirements:
-            req_id = req.get('sys2_id', req.get('id', 'Unknown_ID'))
-            req_text = req.get('sys2_requirement', req.get('content', ''))
-
-            # Enhanced check for unambiguity (basic implementation)
-            unambiguity_status = 'Pass'
-            unambiguity_issues = []
-
-            # Example: Check for vague terms (this list can be expanded)
-            vague_terms = ['flexible', 'efficient', 'robust', 'appropriate', 'adequate']
-            found_vague_terms = [term for term in vague_terms if term.lower() in req_text.lower()]
-            if found_vague_terms:
-                unambiguity_status = 'Fail'
-                unambiguity_issues.append(f'Contains vague terms: {", ".join(found_vague_terms)}')
-
-            # Example: Check for potential pronoun ambiguity (simple check)
-            # This requires more sophisticated NLP for true resolution, but a basic check can look for certain pronouns
-            ambiguous_pronouns = ['it', 'this', 'they']
-            found_ambiguous_pronouns = [pronoun for pronoun in ambiguous_pronouns if pronoun.lower() in req_text.lower()]
-            if found_ambiguous_pronouns:
-                 # This check is very basic and will likely have false positives. More advanced NLP is needed for accuracy.
-                 unambiguity_status = 'Needs Review' # Use 'Needs Review' as it's uncertain without full context
-                 unambiguity_issues.append(f'May contain ambiguous pronouns: {", ".join(found_ambiguous_pronouns)}')
-
-            # Add more sophisticated checks here in the future
-
-            analyzed_requirements.append({
+        req_ids, texts = _unpack_requirements(requirements)
+
+        # Tokenize the texts not analyzed before in batches; only the tokenizer output is needed for these checks
+        new_texts = list(dict.fromkeys(text for text in texts if text not in _LINGUISTIC_CACHE))
+        # Large batches can be spread over worker processes with spacy_n_process
+        n_process = self.spacy_n_process if len(new_texts) > self.spacy_batch_size else 1
+        docs = self.nlp.pipe(new_texts, batch_size=self.spacy_batch_size, n_process=n_process)
+        for text, doc in zip(new_texts, docs):
+            _cache_put(_LINGUISTIC_CACHE, text, self._linguistic_result({token.lower_ for token in doc}))
+
+        # Resolve each distinct text once, then build all rows in a single comprehension
+        results = {}
+        for text in dict.fromkeys(texts):
+            result = _LINGUISTIC_CACHE.get(text)
+            if result is None:
+                result = self._linguistic_result({token.lower_ for token in self.nlp(text)})
+            results[text] = result
+        return [
+            {
                 'sys2_id': req_id,
                 'unambiguity': unambiguity_status,
-                'unambiguity_issues': unambiguity_issues # Include details on issues found
-            })
-        
-        return analyzed_requirements
+                'unambiguity_issues': list(unambiguity_issues) # Include details on issues found
+            }
+            for req_id, (unambiguity_status, unambiguity_issues) in zip(req_ids, map(results.__getitem__, texts))
+        ]
+
+    def _linguistic_result(self, tokens):
+        """Unambiguity status and issues for a requirement, given its set of lowercased tokens."""
+        # Enhanced check for unambiguity (basic implementation)
+        unambiguity_status = 'Pass'
+        unambiguity_issues = []
+
+        # Example: Check for vague terms (this list can be expanded)
+        found_vague_terms = sorted(_VAGUE_TERMS.intersection(tokens))
+        if found_vague_terms:
+            unambiguity_status = 'Fail'
+            unambiguity_issues.append(f'Contains vague terms: {", ".join(found_vague_terms)}')
+
+        # Example: Check for potential pronoun ambiguity (simple check)
+        # This requires more sophisticated NLP for true resolution, but a basic check can look for certain pronouns
+        found_ambiguous_pronouns = sorted(_AMBIGUOUS_PRONOUNS.intersection(tokens))
+        if found_ambiguous_pronouns:
+             # This check is very basic and will likely have false positives. More advanced NLP is needed for accuracy.
+             unambiguity_status = 'Needs Review' # Use 'Needs Review' as it's uncertain without full context
+             unambiguity_issues.append(f'May contain ambiguous pronouns: {", ".join(found_ambiguous_pronouns)}')
+
+        # Add more sophisticated checks here in the future
+
+        return unambiguity_status, tuple(unambiguity_issues)
     
     def _generate_suggestions(self, compliance_results: Dict[str, Any], 
                             linguistic_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -311,12 +467,13 @@ class ReviewAgent(BaseAgent):
         for sys2_req in sys2_requirements:
             req_id = sys2_req.get('id', 'Unknown_SYS2_ID')
             req_content = sys2_req.get('content', 'No SYS.2 content')
+            req_content_lc = req_content.lower()
 
             # Simulate review status (e.g., based on keywords or randomly)
             status = 'compliant'
-            if "implement" in req_content.lower():
+            if "implement" in req_content_lc:
                 status = 'needs_review'
-            if "system" in req_content.lower() and "user" in req_content.lower():
+            if "system" in req_content_lc and "user" in req_content_lc:
                 status = 'non_compliant'
 
             review_results.append({
@@ -344,17 +501,11 @@ class ReviewAgent(BaseAgent):
     def _export_accepted_requirements(self, accepted_requirements: List[Dict[str, Any]]) -> bool:
         """Export accepted requirements to Excel file"""
         try:
-            # Select only the required fields and create a new list of dictionaries
-            export_data = []
-            for req in accepted_requirements:
-                export_data.append({
-                    'SYS.2 Req. ID': req.get('sys2_id', 'N/A'),
-                    'SYS.2 System Requirement': req.get('sys2_requirement', 'N/A')
-                })
-            
-            print("[DEBUG] Export data prepared:", export_data[:5]) # Print first 5 rows for debug
+            # Select only the required fields; rows are written straight from the requirement dicts
+            export_columns = [header for header, _ in self.EXPORT_COLUMNS]
+            export_rows = ([req.get(key, 'N/A') for _, key in self.EXPORT_COLUMNS] for req in accepted_requirements)
 
-            df = pd.DataFrame(export_data)
+            print(f"[DEBUG] Export data prepared: {len(accepted_requirements)} rows")
 
             # Define the output file path
             # Using the hardcoded path provided by the user:
@@ -364,16 +515,25 @@ class ReviewAgent(BaseAgent):
             output_dir = os.path.dirname(output_path)
             os.makedirs(output_dir, exist_ok=True)
 
+            # Optional Parquet sidecar for fast programmatic re-ingestion (requires pyarrow):
+            # output_format 'xlsx' (default), 'parquet' (Parquet only) or 'both'
+            output_format = str(self.get_config('output_format', os.getenv('WHALE_OUTPUT_FORMAT', 'xlsx'))).lower()
+            if output_format in ('parquet', 'both'):
+                export_rows = list(export_rows) # Consumed again by the Excel writer when writing both
+                parquet_path = os.path.splitext(output_path)[0] + '.parquet'
+                pd.DataFrame(export_rows, columns=export_columns).to_parquet(parquet_path, engine='pyarrow', compression='zstd', index=False)
+                print(f"[INFO] Successfully exported accepted requirements to {parquet_path}")
+                if output_format == 'parquet':
+                    return True
+
             print(f"[DEBUG] Attempting to save Excel file to: {output_path}")
 
             try:
-                # Export to Excel with formatting
-                writer = pd.ExcelWriter(output_path, engine='xlsxwriter')
-                df.to_excel(writer, index=False, sheet_name='Accepted Requirements')
-
-                # Get the xlsxwriter workbook and worksheet objects.
-                workbook  = writer.book
-                worksheet = writer.sheets['Accepted Requirements']
+                # Export to Excel with formatting. constant_memory flushes each row to disk as soon as it is
+                # written, so column widths and the header must be set before any data row; strings_to_urls
+                # is off because requirement text never needs URL detection
+                workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True, 'strings_to_urls': False})
+                worksheet = workbook.add_worksheet('Accepted Requirements')
 
                 # Add a header format.
                 header_format = workbook.add_format({
@@ -383,12 +543,8 @@ class ReviewAgent(BaseAgent):
                     'fg_color': '#D7E4BC',
                     'border': 1})
 
-                # Write the column headers with the defined format.
-                for col_num, value in enumerate(df.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
-
                 # Set column widths
-                for i, col in enumerate(df.columns):
+                for i, col in enumerate(export_columns):
                     # Set a default width or calculate based on content (more complex)
                     # A reasonable default for requirement text might be larger
                     width = 30 # Default width
@@ -398,15 +554,19 @@ class ReviewAgent(BaseAgent):
                          width = 20 # Narrower for ID
                     worksheet.set_column(i, i, width)
 
-                # Close the Pandas Excel writer and save the Excel file.
-                writer.close() # This saves the file
+                # Write the column headers with the defined format, then the data rows in order.
+                worksheet.write_row(0, 0, export_columns, header_format)
+                for row_num, row in enumerate(export_rows, 1):
+                    worksheet.write_row(row_num, 0, row)
+
+                # Close the workbook and save the Excel file.
+                workbook.close() # This saves the file
 
                 print(f"[INFO] Successfully exported accepted requirements to {output_path}")
                 return True # Indicate success
 
             except Exception as e:
                 print(f"[ERROR] Exception during Excel export: {e}")
-                import traceback
                 traceback.print_exc()
                 raise e # Re-raise the exception so the backend endpoint catches it
 
@@ -414,6 +574,5 @@ class ReviewAgent(BaseAgent):
             # This outer catch might be redundant if we re-raise inside
             # but good to have during debugging.
             print(f"[ERROR] An error occurred in _export_accepted_requirements: {e}")
-            import traceback
             traceback.print_exc()
             raise e # Re-raise the exception 
\ No newline at end of file
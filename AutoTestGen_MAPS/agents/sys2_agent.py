@@ -1,7 +1,8 @@
-from typing import Dict, List, Any, Union
+from typing import Dict, List, Any, Union, BinaryIO
 from .base_agent import BaseAgent
+from .excel_io import iter_excel_rows
 import spacy
-from transformers import pipeline
+from spacy.symbols import VERB
 import pandas as pd
 import json
 import re
@@ -9,39 +10,214 @@ import uuid
 import os
 import io
 import csv
+import functools
+import threading
+import tempfile
+import shutil
+import xlsxwriter
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 from docx import Document
 from fpdf import FPDF
 
+# Rust-backed XLSX writer for SYS.2 exports written to a file path; optional, xlsxwriter is used without it
+# and for in-memory exports
+try:
+    from rustpy_xlsxwriter import FastExcel
+except ImportError:
+    FastExcel = None
+
+# PDF exports larger than this are spooled to a temporary file on disk instead of kept in memory
+PDF_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# Buffer size of the file a workbook is streamed into when it is exported straight to disk
+XLSX_FILE_BUFFER_SIZE = 1024 * 1024
+
+class Sys2ReportPDF(FPDF):
+    """PDF layout of the SYS.2 requirements report (title header and page-number footer)"""
+
+    def header(self):
+        self.set_font('Arial', 'B', 12)
+        self.cell(0, 10, 'SYS.2 Requirements Report', 0, 1, 'C')
+        self.ln(10)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
+
+def _iter_rows(requirements: List[Dict[str, Any]], fields: List[str]):
+    """Yield each requirement's values for the given fields, in order, defaulting to empty string"""
+    for req in requirements:
+        yield [req.get(field, '') for field in fields]
+
+# Default location of the server-side copy of SYS.2 XLSX exports
+DEFAULT_SYS2_XLSX_SINK_PATH = r'D:\AgentX\AutoTestGen_MAPS_Agents123\AutoTestGen_MAPS\Inputs\sys2_requirements.xlsx'
+
+# Columns of a SYS.1 requirements table that the agent reads
+SYS1_COLUMNS = ('SYS.1 Req. ID', 'SYS.1 System Requirement')
+
+def _keyword_re(keywords):
+    """Compile a case-insensitive alternation matching any of the keywords anywhere in a text (substring match)"""
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords), re.IGNORECASE)
+
+# Keyword categories for the type / priority / verification heuristics (substring match, case-insensitive)
+_KEYWORDS = {
+    'functional': ('shall', 'must', 'will'),
+    'non_functional': ('should', 'may'),
+    'assumption': ('assume', 'assuming', 'assumption'),
+    'constraint': ('constraint', 'limit', 'restrict'),
+    'high_priority': ('critical', 'essential'),
+    'medium_priority': ('important', 'should'),
+    'system_test': ('system test', 'qualification test', 'acceptance test'),
+    'test': ('test', 'verify', 'validate', 'check'),
+    'analysis': ('analyze', 'analysis', 'study'),
+    'inspection': ('inspect', 'inspection', 'review'),
+}
+# One compiled regex per category, used when pyahocorasick is not installed
+_KEYWORD_RES = {category: _keyword_re(keywords) for category, keywords in _KEYWORDS.items()}
+
+@functools.lru_cache(maxsize=1)
+def _get_keyword_automaton():
+    """Build one Aho-Corasick automaton over all category keywords, or None if pyahocorasick is not installed"""
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+    categories_by_keyword: Dict[str, List[str]] = {}
+    for category, keywords in _KEYWORDS.items():
+        for keyword in keywords:
+            categories_by_keyword.setdefault(keyword, []).append(category)
+    automaton = ahocorasick.Automaton()
+    for keyword, categories in categories_by_keyword.items():
+        automaton.add_word(keyword, tuple(categories))
+    automaton.make_automaton()
+    return automaton
+
+@functools.lru_cache(maxsize=4096)
+def _keyword_categories(text: str) -> frozenset:
+    """Return the keyword categories found in a text, scanning it once when pyahocorasick is available"""
+    automaton = _get_keyword_automaton()
+    if automaton is None:
+        return frozenset(category for category, pattern in _KEYWORD_RES.items() if pattern.search(text))
+    return frozenset(category for _, categories in automaton.iter(text.lower()) for category in categories)
+
+@functools.lru_cache(maxsize=1)
+def _get_nlp(use_gpu: str = 'auto'):
+    """Load the spaCy model once per process and share it across Sys2Agent instances.
+
+    use_gpu: 'auto' runs the model on a GPU when spaCy can use one (cupy installed, e.g. via spacy[cuda12x])
+    and silently stays on CPU otherwise; 'on' requires a GPU; 'off' always uses the CPU.
+    """
+    # The GPU must be selected before the model is loaded
+    use_gpu = str(use_gpu).lower()
+    if use_gpu in ('on', 'true', '1'):
+        spacy.require_gpu()
+    elif use_gpu == 'auto':
+        try:
+            spacy.prefer_gpu()
+        except Exception as e:
+            print(f"Could not enable GPU for spaCy, using CPU: {e}")
+    # The agent only uses POS tags, dependency labels and sentences; NER and the lemmatizer are never needed.
+    # attribute_ruler must stay: it maps the tagger output to token.pos_ in en_core_web_sm
+    exclude = ["ner", "lemmatizer"]
+    try:
+        return spacy.load("en_core_web_sm", exclude=exclude)
+    except OSError:
+        print("Downloading en_core_web_sm model...")
+        spacy.cli.download("en_core_web_sm")
+        return spacy.load("en_core_web_sm", exclude=exclude)
+
+@functools.lru_cache(maxsize=1)
+def _get_classifier():
+    """Load the text classification pipeline once per process, or return None if it cannot be loaded"""
+    # Imported here so transformers/PyTorch are only loaded when a classification is first requested
+    try:
+        from transformers import pipeline
+        return pipeline("text-classification")
+    except Exception as e:
+        print(f"Could not load text classification pipeline: {e}")
+        return None # Handle case where pipeline fails to load
+
+def clear_model_cache():
+    """Drop the shared spaCy model and classifier so the next Sys2Agent loads them again (e.g. in tests)"""
+    _get_nlp.cache_clear()
+    _get_classifier.cache_clear()
+
 class Sys2Agent(BaseAgent):
     """Agent 2: SYS.2 Requirement Drafting and Structuring"""
+
+    # Classification and verification mapping assigned to every drafted SYS.2 requirement
+    SYS2_CLASSIFICATION = "Functional"
+    SYS2_VERIFICATION_MAPPING = "System Qualification Test (SYS.5)"
+
+    # IREB and IEEE 830 compliant templates, shared by all instances - can be loaded from a config file later
+    TEMPLATES = MappingProxyType({
+        'functional': "The system shall {requirement}",
+        'non_functional': "The system shall {requirement}",
+        'assumption': "It is assumed that {requirement}",
+        'constraint': "The system is subject to the constraint that {requirement}",
+        # Add more templates as needed (e.g., performance, security)
+    })
+    # Each template split once into the text before and after its {requirement} placeholder
+    _TEMPLATE_PARTS = MappingProxyType({
+        req_type: tuple(template.split('{requirement}', 1)) for req_type, template in TEMPLATES.items()
+    })
+
+    # Words that make a requirement potentially ambiguous, matched against lowercased tokens
+    _AMBIGUITY_MARKERS = frozenset(('may', 'can', 'might', 'possibly', 'usually', 'generally'))
+
+    # Words that open a clause which may hold a condition
+    _CONDITION_WORDS = frozenset(('if', 'when', 'where'))
+
+    # Mentions of other requirement IDs (SYS.1.X / SYS.2.Y) in a requirement text
+    _DEP_ID_RE = re.compile(r'SYS\.[12]\.\w+')
+
+    # Fixed PDF column widths for known field selections, keyed by the fields in export order
+    _PDF_COLUMN_WIDTHS = MappingProxyType({
+        ('sys2_id', 'sys2_requirement'): (40, 150), # Widths for just these two columns
+    })
+    # Default widths for the 11 default columns
+    _PDF_DEFAULT_WIDTHS = (25, 45, 25, 45, 25, 25, 35, 20, 15, 30, 25)
+
+    # Long-text fields truncated in the PDF report
+    _PDF_TRUNCATE_FIELDS = frozenset(('verification_criteria', 'rationale'))
     
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         # Initialize NLP components - consider if a more powerful model is needed later
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except:
-            print("Downloading en_core_web_sm model...")
-            spacy.cli.download("en_core_web_sm")
-            self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = _get_nlp(self.get_config('use_gpu', os.getenv('SYS2_SPACY_GPU', 'auto')))
         
-        # Initialize text classification pipeline - can be fine-tuned later
-        try:
-            self.classifier = pipeline("text-classification")
-        except Exception as e:
-            print(f"Could not load text classification pipeline: {e}")
-            self.classifier = None # Handle case where pipeline fails to load
-
-        self.templates = self._load_templates()
+        # Verbose logging (full requirement lists) is enabled with the 'debug' config key or SYS2_DEBUG=1
+        self.debug_logging = str(self.get_config('debug', os.getenv('SYS2_DEBUG', ''))).lower() in ('1', 'true', 'yes')
+        # Server-side copy of each XLSX export (read by Agent 3's automatic source); set the
+        # 'sys2_xlsx_sink_path' config key or SYS2_XLSX_SINK_PATH to change it, or to '' to skip the copy
+        self.xlsx_sink_path = self.get_config('sys2_xlsx_sink_path', os.getenv('SYS2_XLSX_SINK_PATH', DEFAULT_SYS2_XLSX_SINK_PATH))
+        # Directories already created for export copies
+        self._mkdir_done = set()
         self.setup_pipelines()
     
+    @property
+    def classifier(self):
+        """Text classification pipeline - can be fine-tuned later. Loaded on first access, None if unavailable"""
+        return _get_classifier()
+
     def setup_pipelines(self):
         """Initialize custom NLP pipelines or models if needed"""
         # Example: Add a custom component for requirement structure analysis
         # if 'requirement_structure_analyzer' not in self.nlp.pipe_names:
         #     requirement_structure_analyzer = RequirementStructureAnalyzer(self.nlp)
         #     self.nlp.add_pipe("requirement_structure_analyzer", last=True)
-        pass
+
+        # Integer IDs of the dependency labels the analyses compare against, so tokens are checked via
+        # token.dep (an int) instead of building the token.dep_ string each time
+        strings = self.nlp.vocab.strings
+        self._nsubjpass_dep = strings["nsubjpass"]
+        self._auxpass_dep = strings["auxpass"]
+        self._root_dep = strings["ROOT"]
+        self._subject_deps = frozenset((strings["nsubj"], self._nsubjpass_dep))
+        self._dobj_dep = strings["dobj"]
+        self._clause_deps = frozenset((strings["advcl"], strings["acl"]))
     
     def validate(self, data: Any) -> bool:
         """Validate input data for Sys2Agent."""
@@ -107,11 +283,28 @@ class Sys2Agent(BaseAgent):
             # Initialize a counter for sequential SYS.2 IDs
             sys2_counter = 1
 
+            # Parse each distinct SYS.1 text with spaCy in batches, draft the SYS.2 text from that doc,
+            # then parse the distinct drafted texts in batches too; repeated (boilerplate) requirements reuse the results
+            batch_size = int(os.getenv('SYS2_SPACY_BATCH_SIZE', '64'))
+            sys1_texts = [sys1_req.get('SYS.1 System Requirement', '') for sys1_req in sys1_requirements]
+            unique_sys1_texts = list(dict.fromkeys(sys1_texts))
+            sys1_doc_by_text = dict(zip(unique_sys1_texts, self.nlp.pipe(unique_sys1_texts, batch_size=batch_size)))
+            drafted_by_text = {
+                text: self._technically_evaluate_and_rewrite(text, doc, self._determine_type(text, _keyword_categories(text))) if text.strip() else ''
+                for text, doc in sys1_doc_by_text.items()
+            }
+            # A draft left unchanged by the rewrite reuses its SYS.1 doc; only changed drafts are parsed again
+            drafted_doc_by_text = {drafted: sys1_doc_by_text[text] for text, drafted in drafted_by_text.items() if drafted == text}
+            changed_drafts = list(dict.fromkeys(drafted for drafted in drafted_by_text.values() if drafted not in drafted_doc_by_text))
+            drafted_doc_by_text.update(zip(changed_drafts, self.nlp.pipe(changed_drafts, batch_size=batch_size)))
+
             # Process each SYS.1 requirement
-            for i, sys1_req in enumerate(sys1_requirements):
+            for i, (sys1_req, original_sys1_text) in enumerate(zip(sys1_requirements, sys1_texts)):
                 # Ensure sys1_id and sys1_requirement keys exist
                 sys1_id = sys1_req.get('SYS.1 Req. ID', f'SYS.1.AutoGen_{i+1}') # Use correct key
-                original_sys1_text = sys1_req.get('SYS.1 System Requirement', '') # Get original SYS.1 text
+                categories = _keyword_categories(original_sys1_text) # Keyword categories, shared by type and priority
+                drafted_sys2_text = drafted_by_text[original_sys1_text]
+                drafted_doc = drafted_doc_by_text[drafted_sys2_text]
 
                 if not original_sys1_text.strip():
                     self.log_warning(f"Skipping empty or whitespace SYS.1 requirement for ID: {sys1_id}")
@@ -122,26 +315,25 @@ class Sys2Agent(BaseAgent):
                 sys2_id = f'SYS.2-{sys2_counter:03d}' # Format with leading zeros
                 sys2_counter += 1 # Increment counter for the next requirement
 
-                # Technically evaluate and rewrite the SYS.1 requirement
-                drafted_sys2_text = self._technically_evaluate_and_rewrite(original_sys1_text)
+                # Technically evaluate and rewrite the SYS.1 requirement (done above, batched as drafted_sys2_text)
 
                 # 2. Auto-Fill Metadata
-                priority = self._assign_priority(original_sys1_text) # Infer priority from text
+                priority = self._assign_priority(original_sys1_text, categories) # Infer priority from text
                 # Generate rationale with more context
                 rationale = self._generate_rationale(
                     sys1_id,
                     original_sys1_text,
                     drafted_sys2_text, # Pass drafted text
-                    self._determine_classification(drafted_sys2_text),    # Pass classification
-                    self._map_verification(sys2_id, drafted_sys2_text) # Pass verification mapping
+                    self.SYS2_CLASSIFICATION,    # Pass classification (the one assigned below)
+                    self.SYS2_VERIFICATION_MAPPING # Pass verification mapping (the one assigned below)
                 ) # Link to SYS.1 source
-                req_type = self._determine_type(original_sys1_text) # Determine type (Functional/Non-functional)
+                req_type = self._determine_type(original_sys1_text, categories) # Determine type (Functional/Non-functional)
                 domain = self._infer_domain(original_sys1_text) # Infer domain (Placeholder)
                 release_planning = 'TBD' # Default release planning
 
                 # 3. Classification
                 # Assign classification as 'Functional' for all SYS.2 requirements as requested
-                classification = "Functional"
+                classification = self.SYS2_CLASSIFICATION
                 classification_results[sys2_id] = classification
 
                 # 4. Dependency Mapping (Basic Placeholder)
@@ -160,11 +352,11 @@ class Sys2Agent(BaseAgent):
 
                 # 7. Verification Mapping
                 # Assign verification mapping as 'System Qualification Test (SYS.5)' for all SYS.2 requirements as requested
-                verification_mapping = "System Qualification Test (SYS.5)"
+                verification_mapping = self.SYS2_VERIFICATION_MAPPING
                 verification_mapping_results[sys2_id] = verification_mapping
 
                 # 8. Generate Verification Criteria
-                verification_criteria = self._generate_verification_criteria(drafted_sys2_text, verification_mapping)
+                verification_criteria = self._generate_verification_criteria(drafted_sys2_text, verification_mapping, drafted_doc)
 
                 sys2_requirements.append({
                     'sys1_id': sys1_id, # Keep track of the source SYS.1 ID
@@ -217,20 +409,20 @@ class Sys2Agent(BaseAgent):
 
             try:
                 # Assuming Excel file with columns 'sys1_id' and 'sys1_requirement'
-                df = pd.read_excel(file_path)
+                df = self._read_sys1_table(file_path)
                 self.log_info(f"Successfully read Excel file: {file_path}")
                 self.log_info(f"DataFrame shape: {df.shape}")
                 self.log_info(f"DataFrame columns: {df.columns.tolist()}")
-                # Convert DataFrame rows to a list of dictionaries, ensuring None is handled
-                sys1_requirements = df.where(pd.notnull(df), None).to_dict(orient='records')
-                
-                self.log_info(f"Raw requirements read from Excel (before cleaning): {sys1_requirements}")
+                # Ensure required columns exist and hold strings, defaulting to empty string for missing values
+                df = df.reindex(columns=list(SYS1_COLUMNS)).fillna('').astype(str)
 
-                # Ensure required keys exist and are not None, defaulting to empty string if needed
-                for req in sys1_requirements:
-                    # Use .get() with a default empty string to prevent None
-                    req['SYS.1 Req. ID'] = str(req.get('SYS.1 Req. ID', '')) if req.get('SYS.1 Req. ID') is not None else ''
-                    req['SYS.1 System Requirement'] = str(req.get('SYS.1 System Requirement', '')) if req.get('SYS.1 System Requirement') is not None else ''
+                # Filter out any entries where the requirement text is empty after reading
+                initial_count = len(df)
+                df = df[df['SYS.1 System Requirement'].str.strip() != '']
+                self.log_info(f"Filtered SYS.1 requirements: {len(df)} remaining out of {initial_count}.")
+
+                # Convert DataFrame rows to a list of dictionaries
+                sys1_requirements = df.to_dict(orient='records')
 
             except Exception as e:
                 self.log_error(e, f"Error reading Excel file {file_path}")
@@ -238,112 +430,120 @@ class Sys2Agent(BaseAgent):
 
         elif source == 'raw_text':
             raw_content = input_data.get('raw_content', '')
-            if raw_content.strip():
-                # Simple split by lines for raw text - could be more sophisticated
-                lines = raw_content.strip().split('\n')
-                for i, line in enumerate(lines):
-                    if line.strip(): # Avoid adding empty lines
-                        sys1_requirements.append({
-                            'SYS.1 Req. ID': f'SYS.1.Raw_{i+1}',
-                            'SYS.1 System Requirement': line.strip()
-                        })
-                self.log_info(f"Requirements read from raw text: {sys1_requirements}")
-
-        # Filter out any entries where the requirement text is empty after reading
-        # Ensure req.get() provides a default '' before calling strip()
-        initial_count = len(sys1_requirements)
-        sys1_requirements = [req for req in sys1_requirements if req.get('SYS.1 System Requirement', '').strip()]
-        filtered_count = len(sys1_requirements)
-        self.log_info(f"Filtered SYS.1 requirements: {filtered_count} remaining out of {initial_count}.")
-        self.log_info(f"Filtered requirements: {sys1_requirements}")
+            if raw_content:
+                # Simple split by lines for raw text (any line ending) - could be more sophisticated
+                # Strip each line once and skip the empty ones; IDs number the non-empty lines
+                lines = [text for text in (line.strip() for line in raw_content.splitlines()) if text]
+                sys1_requirements = [
+                    {'SYS.1 Req. ID': f'SYS.1.Raw_{i+1}', 'SYS.1 System Requirement': text}
+                    for i, text in enumerate(lines)
+                ]
+                self.log_info(f"Read {len(sys1_requirements)} requirements from raw text.")
+
+        # Empty requirement texts were already dropped above for both file and raw text input.
+        # Dumping the full list is only done in debug mode, as formatting it costs as much as reading it
+        if self.debug_logging:
+            self.log_info(f"Filtered requirements: {sys1_requirements}")
 
         return sys1_requirements
     
-    def _load_templates(self) -> Dict[str, Any]:
-        """Load IREB and IEEE 830 compliant templates"""
-        # Define templates - can be loaded from a config file later
-        return {
-            'functional': "The system shall {requirement}",
-            'non_functional': "The system shall {requirement}",
-            'assumption': "It is assumed that {requirement}",
-            'constraint': "The system is subject to the constraint that {requirement}",
-            # Add more templates as needed (e.g., performance, security)
-        }
-    
+    def _read_sys1_table(self, file_path: str) -> pd.DataFrame:
+        """Read a SYS.1 requirements table, choosing the reader from the file extension.
+
+        Parquet and Feather are the fastest formats for large requirement sets. Excel sheets are streamed row by
+        row (calamine when available, otherwise openpyxl read-only mode) and only the SYS.1 ID and requirement
+        columns are kept, so memory stays proportional to those two columns rather than the whole sheet.
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == '.parquet':
+            return pd.read_parquet(file_path)
+        if extension == '.feather':
+            return pd.read_feather(file_path)
+        if extension == '.csv':
+            return pd.read_csv(file_path, usecols=lambda column: column in SYS1_COLUMNS)
+
+        rows = iter_excel_rows(file_path)
+        header = [str(column) if column is not None else '' for column in next(rows, ())]
+        # Position of each SYS.1 column in the sheet; columns the sheet lacks are left empty
+        positions = [header.index(column) if column in header else None for column in SYS1_COLUMNS]
+        records = (
+            tuple(row[position] if position is not None and position < len(row) else None for position in positions)
+            for row in rows
+        )
+        return pd.DataFrame.from_records(records, columns=list(SYS1_COLUMNS))
+
     def _apply_single_template(self, requirement_text: str, req_type: str) -> str:
         """Applies a specific template to a requirement text."""
-        template = self.templates.get(req_type.lower(), "{requirement}") # Default to just requirement if type not found
-        # Simple formatting - more complex template engines could be used
-        try:
-            return template.format(requirement=requirement_text)
-        except KeyError:
-            self.log_warning(f"Template for type '{req_type}' not found. Using raw text.")
-            return requirement_text
+        # Default to just requirement if type not found
+        prefix, suffix = self._TEMPLATE_PARTS.get(req_type.lower(), ('', ''))
+        # Plain concatenation around the placeholder - more complex template engines could be used
+        return prefix + requirement_text + suffix
     
-    def _technically_evaluate_and_rewrite(self, sys1_requirement_text: str) -> str:
+    def _technically_evaluate_and_rewrite(self, sys1_requirement_text: str, doc=None, req_type: str = None) -> str:
         """
         Performs a basic technical evaluation and rewrites the SYS.1 requirement.
         This is a placeholder for more sophisticated NLP/rule-based logic.
+        An already parsed spaCy doc of the text can be passed to avoid parsing it again.
         """
         self.log_info(f"Technically evaluating and rewriting: {sys1_requirement_text[:80]}...")
 
-        doc = self.nlp(sys1_requirement_text)
+        if doc is None:
+            doc = self.nlp(sys1_requirement_text)
         evaluation_findings = []
 
+        # Both evaluations below are collected in a single pass over the tokens
         # Evaluation 1: Check for passive voice
         # Basic pattern: aux + verb_past + by (simplified)
         passive_voice_found = False
+        passive_subject = None # First passive subject, used by the rewrite below
+        # Evaluation 2: Check for potential ambiguity markers (simple keyword check)
+        ambiguity_found = False
         for token in doc:
-            if token.dep_ == 'nsubjpass':
-                 # Found a passive subject, check for passive auxiliary
-                 if any(child.dep_ == 'auxpass' for child in token.head.children):
-                     passive_voice_found = True
-                     break
+            if token.dep == self._nsubjpass_dep:
+                if passive_subject is None:
+                    passive_subject = token
+                # Found a passive subject, check for passive auxiliary
+                if not passive_voice_found and any(child.dep == self._auxpass_dep for child in token.head.children):
+                    passive_voice_found = True
+            if not ambiguity_found and token.lower_ in self._AMBIGUITY_MARKERS:
+                ambiguity_found = True
         if passive_voice_found:
              evaluation_findings.append("Potential passive voice detected.")
-
-        # Evaluation 2: Check for potential ambiguity markers (simple keyword check)
-        ambiguity_markers = ['may', 'can', 'might', 'possibly', 'usually', 'generally']
-        if any(token.text.lower() in ambiguity_markers for token in doc):
+        if ambiguity_found:
              evaluation_findings.append("Potential ambiguity marker detected.")
 
         # Placeholder for other checks (e.g., nominalizations, conjunctions like 'and/or')
         # evaluation_findings.extend(self._check_nominalizations(doc))
         # evaluation_findings.extend(self._check_conjunctions(doc))
 
-        # Determine requirement type for templating
-        req_type = self._determine_type(sys1_requirement_text)
+        # Determine requirement type for templating (unless the caller already did)
+        if req_type is None:
+            req_type = self._determine_type(sys1_requirement_text)
 
         # --- Enhanced Rewriting Logic ---
-        rewritten_text_core = sys1_requirement_text.strip() # Start with the original text
+        stripped_text = sys1_requirement_text.strip()
+        rewritten_text_core = stripped_text # Start with the original text
 
         # Basic attempt to make passive sentences active (simplified)
         if passive_voice_found:
             # This is a very basic heuristic and might not work for complex sentences
             # A more robust solution would require deeper dependency parsing and sentence transformation
             try:
-                # Find the passive subject and the verb
-                passive_subject = None
-                passive_verb = None
-                for token in doc:
-                    if token.dep_ == 'nsubjpass':
-                        passive_subject = token
-                        if token.head.pos_ == 'VERB':
-                             passive_verb = token.head
-                        break # Assume one main passive structure for simplicity
-                
+                # Find the verb of the (first) passive subject; assume one main passive structure for simplicity
+                passive_verb = passive_subject.head if passive_subject is not None and passive_subject.head.pos == VERB else None
+
                 if passive_subject and passive_verb:
                      # Attempt to restructure: [Optional Agent] [passive_verb] [passive_subject]
                      # This is highly simplified and likely needs domain-specific rules or advanced NLP
                      # For now, let's just note that passive voice was addressed.
-                     rewritten_text_core = f"[Passive voice considered] {sys1_requirement_text.strip()}"
+                     rewritten_text_core = f"[Passive voice considered] {stripped_text}"
                 else:
                     # If we can't identify subject/verb for restructuring, just note it
-                    rewritten_text_core = f"[Passive voice detected] {sys1_requirement_text.strip()}"
+                    rewritten_text_core = f"[Passive voice detected] {stripped_text}"
 
             except Exception as e:
                 self.log_warning(f"Error attempting passive voice rewrite: {e}")
-                rewritten_text_core = f"[Passive voice detected] {sys1_requirement_text.strip()}"
+                rewritten_text_core = f"[Passive voice detected] {stripped_text}"
         
         # Add notes about other findings if any (excluding passive voice, if handled in rewrite)
         other_findings = [f for f in evaluation_findings if "passive voice" not in f]
@@ -357,44 +557,31 @@ class Sys2Agent(BaseAgent):
 
         return final_sys2_text
     
-    def _transform_to_sys2(self, sys1_requirements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Deprecated: Use process_sys1_input instead."""
-        pass # This method is being replaced
-    
-    def _apply_templates(self, requirements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Deprecated: Template application is now part of process_sys1_input."""
-        pass # This method is being replaced
-    
-    def _map_dependencies(self, requirements: List[Dict[str, Any]]) -> Dict[str, List[str]]:
-        """Deprecated: Dependency mapping is now handled within process_sys1_input."""
-        pass # This method is being replaced
-    
-    def _classify_requirements(self, requirements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Deprecated: Classification is now handled within process_sys1_input."""
-        pass # This method is being replaced
-    
-    def _determine_type(self, content: str) -> str:
-        """Determine requirement type (Functional/Non-functional) - Basic heuristic."""
+    def _determine_type(self, content: str, categories: frozenset = None) -> str:
+        """Determine requirement type (Functional/Non-functional) - Basic heuristic.
+        The keyword categories of the text can be passed in when they were already computed."""
         # Basic heuristic: look for keywords. Can be improved with NLP.
-        content_lower = content.lower()
-        if any(keyword in content_lower for keyword in ['shall', 'must', 'will']):
+        if categories is None:
+            categories = _keyword_categories(content)
+        if 'functional' in categories:
             return 'Functional'
-        elif any(keyword in content_lower for keyword in ['should', 'may']):
+        elif 'non_functional' in categories:
             return 'Non-functional'
-        elif any(keyword in content_lower for keyword in ['assume', 'assuming', 'assumption']):
+        elif 'assumption' in categories:
             return 'Assumption'
-        elif any(keyword in content_lower for keyword in ['constraint', 'limit', 'restrict']):
+        elif 'constraint' in categories:
             return 'Constraint'
         else:
             return 'Other'
     
-    def _assign_priority(self, requirement_text: str) -> str:
+    def _assign_priority(self, requirement_text: str, categories: frozenset = None) -> str:
         """Assign priority based on simple keyword matching - Placeholder."""
         # More sophisticated priority assignment would be needed
-        text_lower = requirement_text.lower()
-        if "critical" in text_lower or "essential" in text_lower:
+        if categories is None:
+            categories = _keyword_categories(requirement_text)
+        if 'high_priority' in categories:
             return 'High'
-        elif "important" in text_lower or "should" in text_lower:
+        elif 'medium_priority' in categories:
             return 'Medium'
         else:
             return 'Low'
@@ -466,66 +653,59 @@ class Sys2Agent(BaseAgent):
         return 'Software' # Default domain changed to Software
     
     def _map_single_requirement_dependencies(self, sys2_id: str, requirement_text: str) -> List[Dict[str, str]]:
-        """Identifies dependencies for a single requirement using NLP and keyword matching."""
-        dependencies = []
-        doc = self.nlp(requirement_text) # Process text with spaCy
-
+        """Identifies dependencies for a single requirement using keyword matching."""
         # 1. Look for mentions of other potential requirement IDs (e.g., SYS.1.X, SYS.2.Y)
         # This regex assumes IDs follow the pattern SYS.[1 or 2].<Alphanumeric+>
-        potential_ids_in_text = re.findall(r'(SYS\.[12]\.\w+)', requirement_text)
-
-        for dep_id in potential_ids_in_text:
-            # Avoid creating a dependency on itself and ensure the mentioned ID looks valid
-            if dep_id != sys2_id and re.match(r'SYS\.[12]\.\w+', dep_id):
-                dependencies.append({
-                    'from': sys2_id,
-                    'to': dep_id,
-                    'label': 'mentions' # Label indicating the dependency type
-                })
+        potential_ids_in_text = self._DEP_ID_RE.findall(requirement_text)
 
         # 2. (Placeholder) Analyze sentence structure or keywords for implicit dependencies
         # This is a complex task requiring more advanced NLP rules or models.
-        # Example: Look for causal verbs, conditional phrases, etc.
+        # Example: Look for causal verbs, conditional phrases, etc. (would need a spaCy doc of the text)
         # for sent in doc.sents:
         #     # Analyze sentence.text or sentence.root.text for dependency indicators
         #     # if 'depends on' in sent.text.lower():
         #     #     # Attempt to extract the dependency relationship and target
         #     #     pass
 
-        # Remove duplicate dependencies
-        # Convert list of dicts to a set of tuples for uniqueness, then back to list of dicts
-        unique_dependencies = set()
-        for dep in dependencies:
-            # Convert dict to a tuple of (key, value) pairs for hashing
-            unique_dependencies.add(tuple(sorted(dep.items())))
-
-        return [dict(t) for t in unique_dependencies]
+        # Avoid creating a dependency on itself and remove duplicates, keeping the order of first mention
+        return [
+            {
+                'from': sys2_id,
+                'to': dep_id,
+                'label': 'mentions' # Label indicating the dependency type
+            }
+            for dep_id in dict.fromkeys(potential_ids_in_text)
+            if dep_id != sys2_id
+        ]
     
-    def _map_verification(self, sys2_id: str, requirement_text: str) -> str:
+    def _map_verification(self, sys2_id: str, requirement_text: str, categories: frozenset = None) -> str:
         """Map requirement to verification method using basic keyword matching."""
-        text_lower = requirement_text.lower()
+        if categories is None:
+            categories = _keyword_categories(requirement_text)
 
         # Check for System Qualification Test keywords first
-        if any(keyword in text_lower for keyword in ['system test', 'qualification test', 'acceptance test']):
+        if 'system_test' in categories:
             return 'System Qualification Test (SYS.5)'
 
         # Existing checks for other verification methods
-        elif any(keyword in text_lower for keyword in ['test', 'verify', 'validate', 'check']):
+        elif 'test' in categories:
             return 'Test'
-        elif any(keyword in text_lower for keyword in ['analyze', 'analysis', 'study']):
+        elif 'analysis' in categories:
             return 'Analysis'
-        elif any(keyword in text_lower for keyword in ['inspect', 'inspection', 'review']):
+        elif 'inspection' in categories:
             return 'Inspection'
         else:
             return 'Test (Default)' # Default verification method
 
-    def _generate_verification_criteria(self, sys2_requirement_text: str, verification_method: str) -> str:
+    def _generate_verification_criteria(self, sys2_requirement_text: str, verification_method: str, doc=None) -> str:
         """
         Generates basic verification criteria based on requirement text and method.
         This is a placeholder and can be enhanced with more sophisticated logic.
+        An already parsed spaCy doc of the text can be passed to avoid parsing it again.
         """
         self.log_info(f"Generating verification criteria for: {sys2_requirement_text[:80]}...")
-        doc = self.nlp(sys2_requirement_text)
+        if doc is None:
+            doc = self.nlp(sys2_requirement_text)
 
         # Basic NLP analysis to extract potential key elements
         main_verb = ''
@@ -534,12 +714,19 @@ class Sys2Agent(BaseAgent):
         conditions = []
 
         for token in doc:
-            if token.dep_ == 'ROOT' and token.pos_ == 'VERB':
+            dep = token.dep
+            if dep == self._root_dep and token.pos == VERB:
                 main_verb = token.text
-                main_subject = next((child.text for child in token.children if child.dep_ == 'nsubj' or child.dep_ == 'nsubjpass'), '')
-                main_object = next((child.text for child in token.children if child.dep_ == 'dobj'), '')
+                main_subject = ''
+                main_object = ''
+                # One pass over the children for both the subject and the object
+                for child in token.children:
+                    if not main_subject and child.dep in self._subject_deps:
+                        main_subject = child.text
+                    elif not main_object and child.dep == self._dobj_dep:
+                        main_object = child.text
             # Simple way to find clauses that might contain conditions (e.g., starting with 'if', 'when')
-            if token.dep_ == 'advcl' or token.dep_ == 'acl' or token.text.lower() in ['if', 'when', 'where']:
+            if dep in self._clause_deps or token.lower_ in self._CONDITION_WORDS:
                  # Attempt to capture the clause text
                  conditions.append(token.sent.text[token.i:].strip())
 
@@ -608,18 +795,23 @@ class Sys2Agent(BaseAgent):
         #         req['priority'] = 'High'
         return sys2_requirements
 
-    def export_requirements(self, requirements: List[Dict[str, Any]], format: str, export_fields_list: List[str] | None = None) -> Union[io.BytesIO, str, None]:
+    def export_requirements(self, requirements: List[Dict[str, Any]], format: str, export_fields_list: List[str] | None = None,
+                            output_path: str | None = None) -> Union[io.BytesIO, str, None]:
         """Exports SYS.2 requirements to the specified format.
 
         Args:
             requirements (List[Dict[str, Any]]): The list of SYS.2 requirements.
             format (str): The desired export format (e.g., 'xlsx', 'csv', 'docx', 'pdf', 'txt').
             export_fields_list (List[str] | None): An optional list of field keys to include in the export. If None, defaults are used.
+            output_path (str | None): For 'xlsx' only, a file path to write the workbook to directly instead of
+                                      building it in memory.
 
         Returns:
             Union[io.BytesIO, str, None]: The exported data in the specified format, or None if format is unsupported.
-                                        For binary formats (xlsx, docx, pdf), returns io.BytesIO.
-                                        For text formats (csv, txt), returns str.
+                                        For binary formats (xlsx, docx, pdf), returns a binary file object
+                                        (io.BytesIO; the pdf is a SpooledTemporaryFile).
+                                        Text formats (csv, txt) are returned UTF-8 encoded in an io.BytesIO.
+                                        With output_path, the xlsx is written there and output_path is returned.
 
         Raises:
             ValueError: If the format is unsupported.
@@ -656,67 +848,69 @@ class Sys2Agent(BaseAgent):
             'req_status': 'Requirement Status'
         }
 
-        # Prepare data in a consistent format for export using the defined fields and headers
-        export_data = []
-        for req in requirements:
-            row = {}
-            for field in fields_to_export:
-                # Use the header_mapping to get the desired column header
-                header = header_mapping.get(field, field) # Default to field name if not in mapping
-                # Get the data from the requirement dictionary, defaulting to empty string
-                row[header] = req.get(field, '')
-            export_data.append(row)
+        # Column headers of the export, in field order
+        headers = [header_mapping.get(field, field) for field in fields_to_export] # Default to field name if not in mapping
 
         if format == 'xlsx':
-            print("[DEBUG] Exporting SYS.2 requirements:", export_data)  # Debug print
-            df = pd.DataFrame(export_data)
+            if self.debug_logging:
+                print("[DEBUG] Exporting SYS.2 requirements:", requirements)  # Debug print
+            if output_path:
+                # Write the workbook straight to the target file, so it is never held in memory as a whole
+                self._write_xlsx(output_path, requirements, fields_to_export, headers)
+                # Also copy it to the sink path in the background, unless that is the file just written
+                if self.xlsx_sink_path and os.path.normcase(os.path.abspath(self.xlsx_sink_path)) != os.path.normcase(os.path.abspath(output_path)):
+                    threading.Thread(target=self._copy_export_file, args=(output_path, self.xlsx_sink_path)).start()
+                return output_path
+
             output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df.to_excel(writer, index=False, sheet_name='SYS2 Requirements')
+            self._write_xlsx(output, requirements, fields_to_export, headers)
             output.seek(0)
 
             # --- Save to Inputs directory on the server ---
-            try:
-                output_path = r'D:\AgentX\AutoTestGen_MAPS_Agents123\AutoTestGen_MAPS\Inputs\sys2_requirements.xlsx'
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                df.to_excel(output_path, index=False)
-                print(f"[DEBUG] Saved XLSX to {output_path}")
-            except Exception as e:
-                print(f"[ERROR] Could not save XLSX to Inputs directory: {e}")
+            # The workbook is serialized once; its bytes are copied to disk in the background
+            # while the in-memory file is returned to the caller. No copy is written if the sink path is empty.
+            if self.xlsx_sink_path:
+                threading.Thread(target=self._save_export_copy, args=(output.getvalue(), self.xlsx_sink_path)).start()
             # ------------------------------------------------
 
             return output
 
         elif format == 'csv':
-            output = io.StringIO()
-            # Use the headers from the export_data (which respects fields_to_export) as fieldnames for CSV header
-            fieldnames = export_data[0].keys() if export_data else []
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(export_data)
-            return output.getvalue()
+            # Encode the CSV straight into the bytes buffer that is returned, instead of building a str
+            # that the caller has to encode into a second copy. The wrapper batches rows into chunks,
+            # so the buffer grows in a few large writes rather than one per row
+            output = io.BytesIO()
+            text_output = io.TextIOWrapper(output, encoding='utf-8', newline='')
+            # Write the mapped headers, then each requirement's fields positionally as they are read
+            writer = csv.writer(text_output)
+            writer.writerow(headers)
+            writer.writerows(_iter_rows(requirements, fields_to_export))
+            text_output.detach() # Flushes the last chunk, keeping the buffer open
+            output.seek(0)
+            return output
 
         elif format == 'docx':
             document = Document()
             document.add_heading('SYS.2 Requirements', 0)
 
-            # Add a table
+            # Add a table, sized up front for the header and every data row
+            # (add_row() per requirement re-walks the table XML each time)
             # Use the number of fields in fields_to_export for column count
-            table = document.add_table(rows=1, cols=len(fields_to_export))
+            column_count = len(fields_to_export)
+            table = document.add_table(rows=1 + len(requirements), cols=column_count)
             table.style = 'Grid Table 4' # Apply a table style
+            # All cells of the table in row-major order, collected once
+            cells = table._cells
 
-            # Add header row using the header_mapping values for the selected fields
-            header_cells = table.rows[0].cells
-            for i, field in enumerate(fields_to_export):
-                 header_cells[i].text = header_mapping.get(field, field) # Use mapped header
+            # Add header row using the mapped headers for the selected fields
+            for i, header in enumerate(headers):
+                 cells[i].text = header
 
-            # Add data rows
-            for row_data in export_data:
-                cells = table.add_row().cells
-                # Iterate through fields_to_export to get data in correct order
-                for i, field in enumerate(fields_to_export):
-                     # Access data using the mapped header key from export_data
-                     cells[i].text = str(row_data.get(header_mapping.get(field, field), ''))
+            # Fill data rows, reading each requirement's fields in export order
+            for row_index, row in enumerate(_iter_rows(requirements, fields_to_export), 1):
+                row_offset = row_index * column_count
+                for i, value in enumerate(row):
+                     cells[row_offset + i].text = str(value)
 
             output = io.BytesIO()
             document.save(output)
@@ -724,18 +918,7 @@ class Sys2Agent(BaseAgent):
             return output
 
         elif format == 'pdf':
-            class PDF(FPDF):
-                def header(self):
-                    self.set_font('Arial', 'B', 12)
-                    self.cell(0, 10, 'SYS.2 Requirements Report', 0, 1, 'C')
-                    self.ln(10)
-
-                def footer(self):
-                    self.set_y(-15)
-                    self.set_font('Arial', 'I', 8)
-                    self.cell(0, 10, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
-
-            pdf = PDF()
+            pdf = Sys2ReportPDF()
             pdf.alias_nb_pages()
             # Determine orientation based on number of columns, or use Landscape by default for potentially wide tables
             orientation = 'L' if len(fields_to_export) > 5 else 'P' # Simple heuristic for orientation
@@ -746,62 +929,135 @@ class Sys2Agent(BaseAgent):
             # For simplicity, we can try to distribute available width, or use fixed widths for known fields.
             # A better approach for a general export would be dynamic width calculation or configuration.
             # For this specific request (SYS.2 ID and SYS.2 Requirement), we can use fixed widths.
-            if export_fields_list == ['sys2_id', 'sys2_requirement']:
-                 col_widths = [40, 150] # Example widths for just these two columns
-            elif len(fields_to_export) == 11: # Assume default 11 columns
-                 col_widths = [
-                    25, 45, 25, 45, 25, 25, 35, 20, 15, 30, 25 # Default widths for 11 columns
-                 ]
-            else:
-                # Fallback: simple equal distribution of width
-                page_width = pdf.w - 2 * pdf.l_margin
-                col_width = page_width / len(fields_to_export)
-                col_widths = [col_width] * len(fields_to_export)
+            col_widths = self._PDF_COLUMN_WIDTHS.get(tuple(fields_to_export))
+            if col_widths is None:
+                if len(fields_to_export) == 11: # Assume default 11 columns
+                    col_widths = self._PDF_DEFAULT_WIDTHS
+                else:
+                    # Fallback: simple equal distribution of width
+                    page_width = pdf.w - 2 * pdf.l_margin
+                    col_widths = [page_width / len(fields_to_export)] * len(fields_to_export)
 
             # Add table headers using the header_mapping values for the selected fields
             pdf.set_font('Arial', 'B', 8) # Smaller font for more columns
-            for i, field in enumerate(fields_to_export):
+            for col_width, header in zip(col_widths, headers):
                  # Use multi_cell for headers that might wrap
-                 pdf.multi_cell(col_widths[i], 10, header_mapping.get(field, field), 1, 'C', False, 0)
+                 pdf.multi_cell(col_width, 10, header, 1, 'C', False, 0)
             pdf.ln()
 
-            # Add table rows
+            # Add table rows; the data font is set once here (fpdf restores it after the header/footer of each new page)
             pdf.set_font('Arial', '', 7) # Even smaller font for data
             # Truncation is less critical if only two fields are exported, but keeping the logic
             truncate_limit = 150 # Define truncation limit
-            for row_data in export_data:
-                for i, field in enumerate(fields_to_export):
-                    header = header_mapping.get(field, field)
-                    cell_data = str(row_data.get(header, '')) # Get data as string
-                    
+            # Per column: its width and whether its text is truncated, worked out once instead of per cell
+            columns = [(col_width, field in self._PDF_TRUNCATE_FIELDS)
+                       for col_width, field in zip(col_widths, fields_to_export)]
+            cell = pdf.multi_cell
+            new_line = pdf.ln
+            for row in _iter_rows(requirements, fields_to_export):
+                for (col_width, truncate), value in zip(columns, row):
+                    cell_data = str(value) # Get data as string
+
                     # Apply truncation to specific columns if they are among the exported fields
-                    if field in ['verification_criteria', 'rationale'] and len(cell_data) > truncate_limit:
+                    if truncate and len(cell_data) > truncate_limit:
                         cell_data = cell_data[:truncate_limit] + '...'
 
                     # Use multi_cell for data that might wrap
-                    pdf.multi_cell(col_widths[i], 10, cell_data, 1, 'L', False, 0)
-                pdf.ln()
-
-            output = io.BytesIO()
-            # Use dest='S' to get the raw bytes output
-            pdf_bytes = pdf.output(dest='S').encode('latin-1') # Output as string first, then encode
-            output.write(pdf_bytes)
-            output.seek(0);
+                    cell(col_width, 10, cell_data, 1, 'L', False, 0)
+                new_line()
+
+            # fpdf2 builds the document in a bytearray and returns it directly; it is written straight into a
+            # spooled temporary file, which moves to disk above PDF_SPOOL_MAX_SIZE so large reports do not stay
+            # in memory (no extra bytes()/BytesIO copies) while the response is being sent
+            output = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+            output.write(pdf.output())
+            output.seek(0)
             return output
 
         elif format == 'txt':
-            output = io.StringIO()
-            # Use the headers from export_data as fieldnames for TXT header
-            output.write('	'.join([header for header in export_data[0].keys()]) + '\n' if export_data else '') # Ensure header is written correctly
-            for row_data in export_data:
-                 # Iterate through the keys (headers) of the row_data dictionary to maintain order and use mapped headers
-                 output.write('	'.join([str(row_data.get(header, '')) for header in export_data[0].keys()]) + '\n')
-            return output.getvalue()
+            output = io.BytesIO()
+            text_output = io.TextIOWrapper(output, encoding='utf-8', newline='')
+            # Tab-separated: the mapped headers, then one line per requirement in field order
+            writer = csv.writer(text_output, delimiter='\t', lineterminator='\n')
+            writer.writerow(headers)
+            writer.writerows(_iter_rows(requirements, fields_to_export))
+            text_output.detach()
+            output.seek(0)
+            return output
 
         else:
             # Raise ValueError for unsupported formats
             raise ValueError(f"Unsupported export format: {format}")
 
+    def bulk_export(self, requirements: List[Dict[str, Any]], formats: List[str], export_fields_list: List[str] | None = None) -> Dict[str, Union[io.BytesIO, str, None]]:
+        """Exports SYS.2 requirements to several formats at once, building the formats concurrently.
+
+        Args:
+            requirements (List[Dict[str, Any]]): The list of SYS.2 requirements.
+            formats (List[str]): The export formats ('xlsx', 'csv', 'docx', 'pdf', 'txt').
+            export_fields_list (List[str] | None): Optional list of fields to export, as for export_requirements.
+
+        Returns:
+            Dict[str, Union[io.BytesIO, str, None]]: The export_requirements result of each format, keyed by format.
+
+        Raises:
+            ValueError: If one of the formats is unsupported.
+        """
+        formats = list(dict.fromkeys(formats))
+        if len(formats) <= 1:
+            return {fmt: self.export_requirements(requirements, fmt, export_fields_list) for fmt in formats}
+
+        # Threads rather than processes: the agent (with its spaCy model) and the spooled PDF file are not
+        # worth pickling, and the writers spend part of their time in zlib compression and file I/O
+        with ThreadPoolExecutor(max_workers=min(len(formats), os.cpu_count() or 1)) as executor:
+            futures = {fmt: executor.submit(self.export_requirements, requirements, fmt, export_fields_list) for fmt in formats}
+            return {fmt: future.result() for fmt, future in futures.items()}
+
+    def _write_xlsx(self, target: Union[str, BinaryIO], requirements: List[Dict[str, Any]], fields_to_export: List[str], headers: List[str]):
+        """Write the SYS.2 requirements workbook to a file path or a writable binary file object"""
+        if isinstance(target, str):
+            if FastExcel is not None:
+                # Rust-backed writer takes a file path and consumes a list of row dicts keyed by the mapped headers
+                export_data = [{header: req.get(field, '') for field, header in zip(fields_to_export, headers)}
+                               for req in requirements]
+                FastExcel(target).sheet('SYS2 Requirements', export_data).save()
+                return
+            with open(target, 'wb', buffering=XLSX_FILE_BUFFER_SIZE) as f:
+                self._write_xlsx(f, requirements, fields_to_export, headers)
+        else:
+            # Write the rows straight from the requirements; constant_memory flushes each row as it is written
+            workbook = xlsxwriter.Workbook(target, {'constant_memory': True, 'strings_to_urls': False})
+            worksheet = workbook.add_worksheet('SYS2 Requirements')
+            worksheet.write_row(0, 0, headers)
+            for row_num, row in enumerate(_iter_rows(requirements, fields_to_export), 1):
+                worksheet.write_row(row_num, 0, row)
+            workbook.close()
+
+    def _copy_export_file(self, source_path: str, output_path: str):
+        """Copy an export file already written to disk to another location on the server"""
+        try:
+            output_dir = os.path.dirname(output_path)
+            if output_dir not in self._mkdir_done:
+                os.makedirs(output_dir, exist_ok=True)
+                self._mkdir_done.add(output_dir)
+            shutil.copyfile(source_path, output_path)
+            print(f"[DEBUG] Saved XLSX to {output_path}")
+        except Exception as e:
+            print(f"[ERROR] Could not save XLSX to Inputs directory: {e}")
+
+    def _save_export_copy(self, data: bytes, output_path: str):
+        """Write an already serialized export file to disk on the server"""
+        try:
+            output_dir = os.path.dirname(output_path)
+            if output_dir not in self._mkdir_done:
+                os.makedirs(output_dir, exist_ok=True)
+                self._mkdir_done.add(output_dir)
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            print(f"[DEBUG] Saved XLSX to {output_path}")
+        except Exception as e:
+            print(f"[ERROR] Could not save XLSX to Inputs directory: {e}")
+
     def get_dashboard_summary(self, requirements: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Calculates summary statistics for the SYS.2 dashboard.
@@ -816,22 +1072,25 @@ class Sys2Agent(BaseAgent):
 
         total_sys2_reqs = len(requirements)
 
-        # Traceability to SYS.1 (assuming sys1_id is present if traced)
-        traced_to_sys1_count = sum(1 for req in requirements if req.get('sys1_id'))
+        # Traceability to SYS.1 (assuming sys1_id is present if traced) and all breakdowns in one pass
+        status_counter = Counter()
+        classification_counter = Counter()
+        verification_counter = Counter()
+        traced_to_sys1_count = 0
+        for req in requirements:
+            if req.get('sys1_id'):
+                traced_to_sys1_count += 1
+            status_counter[req.get('req_status', 'Other')] += 1
+            classification_counter[req.get('classification', 'Other')] += 1
+            verification_counter[req.get('verification_mapping', 'Other')] += 1
         not_traced_to_sys1_count = total_sys2_reqs - traced_to_sys1_count
 
         # Breakdown by Status
-        status_counts: Dict[str, int] = {'Draft': 0, 'Reviewed': 0, 'Approved': 0, 'Rejected': 0, 'Other': 0}
-        for req in requirements:
-            status = req.get('req_status', 'Other')
-            status_counts[status] = status_counts.get(status, 0) + 1
-
+        status_counts: Dict[str, int] = {'Draft': 0, 'Reviewed': 0, 'Approved': 0, 'Rejected': 0, 'Other': 0, **status_counter}
         # Breakdown by Classification
-        classification_counts: Dict[str, int] = {'Functional': 0, 'Non-Functional': 0, 'Assumption': 0, 'Constraint': 0, 'Other': 0}
-        for req in requirements:
-            classification = req.get('classification', 'Other')
-            classification_counts[classification] = classification_counts.get(classification, 0) + 1
-
+        classification_counts: Dict[str, int] = {
+            'Functional': 0, 'Non-Functional': 0, 'Assumption': 0, 'Constraint': 0, 'Other': 0, **classification_counter
+        }
         # Breakdown by Verification Method
         verification_counts: Dict[str, int] = {
             'System Qualification Test (SYS.5)': 0,
@@ -839,11 +1098,9 @@ class Sys2Agent(BaseAgent):
             'Analysis': 0,
             'Inspection': 0,
             'Test (Default)': 0,
-            'Other': 0 # Catch any unexpected values
+            'Other': 0, # Catch any unexpected values
+            **verification_counter
         }
-        for req in requirements:
-             method = req.get('verification_mapping', 'Other')
-             verification_counts[method] = verification_counts.get(method, 0) + 1
 
         summary = {
             'total_sys2_reqs': total_sys2_reqs,
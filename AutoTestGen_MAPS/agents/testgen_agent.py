@@ -2,6 +2,41 @@ from .base_agent import BaseAgent
 from typing import Dict, List, Any, Optional
 import pandas as pd
 import os
+import hashlib
+import tempfile
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+# Fixed text shared by every generated test case
+_PRECONDITIONS = "System is set up and ready for validation."
+_TEST_STEPS = "1. Review the requirement.\n2. Execute the system function as described."
+_PASS_FAIL_CRITERIA = "Test passes if the expected result is observed without deviation."
+
+# Feather sidecars of parsed workbooks are kept in this directory rather than next to the (user-chosen) input
+SIDECAR_DIR = os.getenv('WHALE_SIDECAR_DIR', os.path.join(tempfile.gettempdir(), 'whale_sidecars'))
+
+def _sidecar_prefix(file_path: str) -> str:
+    """File name prefix shared by all sidecars of one workbook path"""
+    return hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest() + '-'
+
+def _sidecar_path(file_path: str, stat: os.stat_result) -> str:
+    """Sidecar of one version of a workbook; the name records the workbook's mtime (ns) and size, so a
+    replaced workbook never matches an old sidecar, even if the copy kept an older mtime"""
+    return os.path.join(SIDECAR_DIR, f"{_sidecar_prefix(file_path)}{stat.st_mtime_ns}-{stat.st_size}.feather")
+
+def remove_sidecars(file_path: str, keep: Optional[str] = None):
+    """Remove the sidecars of a workbook path (except keep), e.g. once a temporary upload is deleted"""
+    prefix = _sidecar_prefix(file_path)
+    try:
+        entries = list(os.scandir(SIDECAR_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name.startswith(prefix) and entry.path != keep:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
 
 class TestGenAgent(BaseAgent):
     """Agent 4: SYS.2 to SYS.5 Test Case Generator"""
@@ -29,6 +64,9 @@ class TestGenAgent(BaseAgent):
             "sys2_requirements_reviewed.xlsx"
         )
 
+        # Loaded requirements keyed by (path, mtime, size), so unchanged files are not parsed again
+        self._req_cache: Dict[tuple, List[Dict[str, Any]]] = {}
+
     def load_requirements(self, file_path: str) -> List[Dict[str, Any]]:
         """Load SYS.2 requirements from a specified Excel file."""
         print(f"[{self.agent_name}] Attempting to load requirements from: {file_path}")
@@ -36,43 +74,86 @@ class TestGenAgent(BaseAgent):
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Input file not found: {file_path}")
 
+        stat = os.stat(file_path)
+        cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        if cache_key in self._req_cache:
+            cached = self._req_cache[cache_key]
+            print(f"[{self.agent_name}] Using cached requirements ({len(cached)}) for unchanged file.")
+            return list(cached)
+
         try:
-            # Read the Excel file
-            df = pd.read_excel(file_path)
-            
+            # Read the Excel file, parsing only the required columns as strings
+            df = self._read_requirements_table(file_path)
+
+            # Check the expected columns once and provide a default empty string for missing ones
+            missing_columns = [col for col in self.REQUIRED_COLUMNS if col not in df.columns]
+            if missing_columns:
+                print(f"[{self.agent_name}] Warning: Missing expected columns in {file_path}: {', '.join(missing_columns)}")
+                for col in missing_columns:
+                    df[col] = ""
+
             # Convert relevant columns to list of dictionaries
-            # Use the defined REQUIRED_COLUMNS to select and potentially rename columns
-            loaded_data = []
-            for index, row in df.iterrows():
-                req_data = {}
-                missing_columns = []
-                for col, dtype in self.REQUIRED_COLUMNS.items():
-                    if col in df.columns:
-                        # Safely convert data, handle potential NaN/None if necessary
-                        value = row[col]
-                        # Simple handling for float NaNs in string columns
-                        if pd.isna(value) and dtype == str:
-                            req_data[col] = ""
-                        else:
-                             req_data[col] = str(value) if dtype == str else value # Ensure correct type or keep original
-                    else:
-                        missing_columns.append(col)
-                        req_data[col] = "" # Provide a default empty string for missing expected columns
-
-                if missing_columns:
-                    print(f"[{self.agent_name}] Warning: Missing expected columns in {file_path}: {', '.join(missing_columns)}")
-                
-                # Only include rows that have at least an ID or a requirement text
-                if req_data.get('SYS.2 Req. ID') or req_data.get('SYS.2 System Requirement'):
-                     loaded_data.append(req_data)
+            # Empty cells are filled once for the whole frame instead of checked per cell
+            columns = list(self.REQUIRED_COLUMNS)
+            column_values = [df[col].fillna("").tolist() for col in columns]
+            # Only include rows that have at least an ID or a requirement text
+            loaded_data = [
+                dict(zip(columns, row))
+                for row in zip(*column_values)
+                if row[0] or row[1]
+            ]
 
             print(f"[{self.agent_name}] Successfully loaded {len(loaded_data)} requirements.")
-            return loaded_data
+            # Keep only the latest version of each file
+            for key in [key for key in self._req_cache if key[0] == cache_key[0]]:
+                del self._req_cache[key]
+            self._req_cache[cache_key] = loaded_data
+            return list(loaded_data)
             
         except Exception as e:
             print(f"[{self.agent_name}] Error loading file {file_path}: {e}")
             raise IOError(f"Error reading Excel file {file_path}: {e}")
 
+    def _read_requirements_table(self, file_path: str) -> pd.DataFrame:
+        """Read the required columns of a requirements Excel file as strings.
+
+        A Feather sidecar in SIDECAR_DIR is read instead of the workbook when it was written for the same
+        workbook version (mtime and size), and is written after each Excel parse. The workbook is parsed
+        with the Rust-based calamine engine unless WHALE_XLSX_ENGINE selects another one or
+        python-calamine is not installed.
+        """
+        sidecar_path = _sidecar_path(file_path, os.stat(file_path))
+        if os.path.exists(sidecar_path):
+            try:
+                df = pd.read_feather(sidecar_path)
+                return df[[col for col in df.columns if col in self.REQUIRED_COLUMNS]]
+            except Exception as e:
+                print(f"[{self.agent_name}] Warning: Could not read sidecar {sidecar_path}, reading Excel instead: {e}")
+
+        read_kwargs = {
+            'usecols': lambda col: col in self.REQUIRED_COLUMNS,
+            'dtype': str,
+        }
+        df = None
+        if os.getenv('WHALE_XLSX_ENGINE', 'calamine').lower() == 'calamine':
+            try:
+                df = pd.read_excel(file_path, engine='calamine', **read_kwargs)
+            except (ImportError, ValueError):
+                # python-calamine missing, or pandas older than 2.2 without the calamine engine
+                pass
+        if df is None:
+            df = pd.read_excel(file_path, **read_kwargs)
+
+        # Save the parsed columns for the next load; requires pyarrow, skipped if it cannot be written
+        try:
+            os.makedirs(SIDECAR_DIR, exist_ok=True)
+            df.reset_index(drop=True).to_feather(sidecar_path)
+            # Sidecars of earlier versions of this workbook are no longer valid
+            remove_sidecars(file_path, keep=sidecar_path)
+        except Exception as e:
+            print(f"[{self.agent_name}] Warning: Could not write sidecar {sidecar_path}: {e}")
+        return df
+
     def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Basic process method for Agent 4."""
         print(f"[{self.agent_name}] Processing data: {data}")
@@ -99,22 +180,44 @@ class TestGenAgent(BaseAgent):
             'message': f'{self.agent_name} data validated successfully.'
         }
 
+    # Requirement sets larger than this are generated in batches of PARALLEL_BATCH_SIZE on a thread pool, so
+    # per-row generation that waits on I/O (e.g. a model service) overlaps across batches
+    PARALLEL_THRESHOLD = 2000
+    PARALLEL_BATCH_SIZE = 256
+
     def generate_test_cases(self, requirements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Generate SYS.5 test cases from SYS.2 requirements, including all required fields."""
-        test_cases = []
-        for idx, req in enumerate(requirements, 1):
-            sys2_id = req.get('SYS.2 Req. ID', f'SYS2-{idx}')
-            sys2_req = req.get('SYS.2 System Requirement', '')
-            test_case = {
-                'SYS.2 Req. ID': sys2_id,
-                'SYS.2 System Requirement': sys2_req,
-                'Test Case ID': f"TC-{sys2_id}",
-                'Description': f"Validate: {sys2_req}",
-                'Preconditions': "System is set up and ready for validation.",
-                'Test Steps': "1. Review the requirement.\n2. Execute the system function as described.",
-                'Expected Results': f"System meets the requirement: {sys2_req}",
-                'Pass/Fail Criteria': "Test passes if the expected result is observed without deviation.",
-                'Priority': req.get('Priority', 'Medium'),
-            }
-            test_cases.append(test_case)
-        return test_cases 
\ No newline at end of file
+        if len(requirements) <= self.PARALLEL_THRESHOLD:
+            # Small inputs are not worth the thread start-up cost
+            return _generate_batch(requirements, 1)
+
+        batch_size = self.PARALLEL_BATCH_SIZE
+        starts = range(0, len(requirements), batch_size)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            # map() keeps the batches in input order; start indexes keep the SYS2-<n> fallback IDs unchanged
+            batches = executor.map(
+                _generate_batch,
+                (requirements[start:start + batch_size] for start in starts),
+                (start + 1 for start in starts)
+            )
+            return list(itertools.chain.from_iterable(batches))
+
+def _generate_batch(requirements: List[Dict[str, Any]], start_idx: int) -> List[Dict[str, Any]]:
+    """Generate the test cases for a batch of requirements, numbering fallback IDs from start_idx"""
+    return [_build_test_case(idx, req) for idx, req in enumerate(requirements, start_idx)]
+
+def _build_test_case(idx: int, req: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the test case of one SYS.2 requirement; idx numbers the fallback ID of requirements without one"""
+    sys2_id = req.get('SYS.2 Req. ID', f'SYS2-{idx}')
+    sys2_req = req.get('SYS.2 System Requirement', '')
+    return {
+        'SYS.2 Req. ID': sys2_id,
+        'SYS.2 System Requirement': sys2_req,
+        'Test Case ID': f"TC-{sys2_id}",
+        'Description': f"Validate: {sys2_req}",
+        'Preconditions': _PRECONDITIONS,
+        'Test Steps': _TEST_STEPS,
+        'Expected Results': f"System meets the requirement: {sys2_req}",
+        'Pass/Fail Criteria': _PASS_FAIL_CRITERIA,
+        'Priority': req.get('Priority', 'Medium'),
+    }
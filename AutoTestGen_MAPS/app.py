@@ -1,31 +1,208 @@
-from flask import Flask, render_template, request, jsonify, send_file, make_response, session, Response
+from flask import Flask, Request, render_template, request, jsonify, send_file, make_response, session, Response
+from flask.logging import default_handler
 from dotenv import load_dotenv
+from werkzeug.utils import secure_filename
 import os
 import webbrowser
 from agents.intake_agent import ElicitationAgent
 from agents.sys2_agent import Sys2Agent
 from agents.review_agent import ReviewAgent
-from agents.testgen_agent import TestGenAgent
+from agents.testgen_agent import TestGenAgent, remove_sidecars
+from agents.excel_io import iter_excel_rows
 import pptx
 import email
 import extract_msg
-import pandas as pd
-from typing import List, Dict, Any
+import PyPDF2
+from typing import List, Dict, Any, Callable, Optional
 import io
 import csv
+import json
+import pickle
+import shutil
 import docx as docx_lib
+import xlsxwriter
 from fpdf import FPDF
 import time
+import socket
 import threading
+import queue
+import atexit
+import sys
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import hashlib
+import tempfile
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 from datetime import datetime
 
+# PyMuPDF is optional; PDF uploads are read with PyPDF2 without it
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+# orjson is optional; large JSON responses fall back to Flask's jsonify without it
+try:
+    import orjson
+    # Allow non-string dict keys and numpy values (e.g. read from pandas) in responses
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+except ImportError:
+    orjson = None
+
+# Flask-Session is optional; without it the requirement lists are kept in the signed session cookie
+try:
+    from flask_session import Session
+except ImportError:
+    Session = None
+
+# Flask-Compress is optional; without it responses are sent uncompressed
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+# msgpack is optional; it encodes Redis sessions and Agent 4 data, and msgpack responses for clients that ask for them
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Flask 2.2+ lets the app's JSON provider be replaced; older versions keep the stdlib json encoder
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    DefaultJSONProvider = None
+
 # Load environment variables
 load_dotenv()
 
+# Uploaded files up to this size stay in memory instead of going to a temporary file on disk
+# (Werkzeug's default moves anything above 500KB to disk), so they can be parsed straight from the request
+UPLOAD_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+class _OrjsonRequestJSON:
+    """JSON module for request bodies on Flask < 2.2, which has no JSON provider to override"""
+    loads = staticmethod(orjson.loads if orjson is not None else json.loads)
+    dumps = staticmethod(json.dumps)
+
+class AppRequest(Request):
+    """Request that keeps uploaded files in memory up to UPLOAD_SPOOL_MAX_SIZE and parses JSON bodies with orjson"""
+
+    if orjson is not None and DefaultJSONProvider is None:
+        # On Flask 2.2+ the ORJSONProvider below handles request.get_json() instead
+        json_module = _OrjsonRequestJSON
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_SIZE, mode='rb+')
+
 app = Flask(__name__)
+app.request_class = AppRequest
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+UPLOAD_COPY_CHUNK_SIZE = 1024 * 1024  # Chunk size for writing uploads to disk
+
+# Request tracing goes through the app logger with lazy %-formatting, so it costs nothing unless enabled;
+# set WHALE_LOG_LEVEL=DEBUG to see it
+logger = app.logger
+logger.setLevel(os.getenv('WHALE_LOG_LEVEL', 'INFO').upper())
+
+# Request threads only enqueue log records; a single listener thread formats them and writes to stdout,
+# so logging never blocks a request on console I/O
+LOG_STREAM_BUFFER_SIZE = 64 * 1024
+_log_stream = sys.stdout
+if getattr(sys.stdout, 'buffer', None) is not None:
+    _log_stream = io.TextIOWrapper(io.BufferedWriter(sys.stdout.buffer, buffer_size=LOG_STREAM_BUFFER_SIZE),
+                                   encoding=sys.stdout.encoding, errors='replace', line_buffering=False)
+_log_handler = logging.StreamHandler(_log_stream)
+_log_handler.setFormatter(default_handler.formatter)
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, _log_handler, respect_handler_level=True)
+logger.removeHandler(default_handler)
+logger.addHandler(QueueHandler(_log_queue))
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+def _msgpack_default(value):
+    """Encode values msgpack has no type for, e.g. datetime/Timestamp cells or numpy scalars read from a workbook"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def _pack_value(value) -> bytes:
+    """Encode a value stored in Redis outside the session (msgpack, or JSON without it)"""
+    if msgpack is not None:
+        return msgpack.packb(value, use_bin_type=True, default=_msgpack_default)
+    return json.dumps(value, default=str).encode('utf-8')
+
+def _unpack_value(data: bytes):
+    """Decode a value encoded with _pack_value"""
+    if msgpack is not None:
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+class MsgpackSessionSerializer:
+    """Session serializer for Flask-Session's Redis store, with the dumps/loads interface of pickle"""
+
+    def dumps(self, obj):
+        return msgpack.packb(obj, use_bin_type=True, default=_msgpack_default)
+
+    def loads(self, data):
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception:
+            # Session stored by the default pickle serializer before msgpack was enabled
+            return pickle.loads(data)
+
+# Server-side sessions: the requirement lists stored in the session quickly outgrow the ~4KB cookie limit, and a
+# cookie session re-signs and re-encodes the whole list on every request. With Flask-Session installed the cookie
+# only holds a session id; SESSION_TYPE selects the store ('filesystem' by default, 'redis' uses REDIS_URL).
+if Session is not None:
+    app.config['SESSION_TYPE'] = os.getenv('SESSION_TYPE', 'filesystem')
+    # Sign the session id cookie with SECRET_KEY; only this id travels with each request
+    app.config['SESSION_USE_SIGNER'] = True
+    # Flask-Session 0.7+ encodes sessions with msgpack when this is set (older releases ignore it)
+    app.config['SESSION_SERIALIZATION_FORMAT'] = 'msgpack'
+    if app.config['SESSION_TYPE'] == 'redis':
+        import redis
+        app.config['SESSION_REDIS'] = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    else:
+        app.config['SESSION_FILE_DIR'] = os.getenv('SESSION_FILE_DIR', os.path.join(app.instance_path, 'flask_session'))
+    Session(app)
+    # The Redis store pickles the whole session on every write; msgpack encodes the plain lists/dicts of
+    # requirements faster and more compactly (for Flask-Session releases with a pickle-like 'serializer')
+    if (msgpack is not None and app.config['SESSION_TYPE'] == 'redis'
+            and hasattr(getattr(app.session_interface, 'serializer', None), 'dumps')):
+        app.session_interface.serializer = MsgpackSessionSerializer()
+
+# Compress large responses (the dashboard and test case payloads can run to megabytes of repetitive JSON).
+# Brotli at a low level is preferred, falling back to gzip for clients without it; small bodies are left alone.
+if Compress is not None:
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_BR_LEVEL'] = 4
+    app.config['COMPRESS_LEVEL'] = 6
+    app.config['COMPRESS_MIN_SIZE'] = 4096
+    app.config['COMPRESS_MIMETYPES'] = ['application/json', 'application/msgpack', 'text/html', 'text/css',
+                                        'text/javascript', 'application/javascript', 'text/csv', 'text/plain']
+    Compress(app)
+
+if orjson is not None and DefaultJSONProvider is not None:
+    class ORJSONProvider(DefaultJSONProvider):
+        """Serialize jsonify() responses and parse request JSON with orjson"""
+
+        def dumps(self, obj, **kwargs):
+            # Fall back to Flask's own conversions (dates, dataclasses, ...) for types orjson does not know
+            return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = ORJSONProvider(app)
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -36,9 +213,92 @@ sys2_agent = Sys2Agent()
 review_agent = ReviewAgent()
 testgen_agent = TestGenAgent() # Initialize Agent 4
 
+def fast_jsonify(payload):
+    """Build a JSON response with orjson when it is installed (much faster for large requirement lists).
+
+    Values that are not JSON serializable are written as their str().
+    """
+    if orjson is None:
+        return Response(json.dumps(payload, default=str), mimetype='application/json')
+    return Response(orjson.dumps(payload, default=str, option=ORJSON_OPTIONS), mimetype='application/json')
+
+def _prefers_msgpack() -> bool:
+    """Whether the client's Accept header prefers application/msgpack over JSON (and msgpack is installed)"""
+    return msgpack is not None and request.accept_mimetypes.best_match(['application/json', 'application/msgpack']) == 'application/msgpack'
+
+def negotiated_response(payload):
+    """Build a msgpack response for clients that ask for application/msgpack, and a JSON one otherwise.
+
+    Values msgpack cannot encode are written as their str(), as in fast_jsonify.
+    """
+    if _prefers_msgpack():
+        return Response(msgpack.packb(payload, use_bin_type=True, default=str), mimetype='application/msgpack')
+    return fast_jsonify(payload)
+
+# Columns of the Agent 1 SYS.1 exports
+SYS1_EXPORT_HEADERS = ('Customer Req. ID(s)', 'Customer Requirement', 'SYS.1 Req. ID', 'SYS.1 System Requirement', 'Domain', 'Priority', 'Rationale', 'Requirement Status')
+SYS1_PDF_HEADERS = ('Customer Req. ID(s)', 'Customer Req.', 'SYS.1 Req. ID', 'SYS.1 System Req.', 'Domain', 'Priority', 'Rationale', 'Status')
+SYS1_PDF_COL_WIDTHS = (30, 50, 20, 50, 20, 20, 40, 20)
+# ID and requirement columns of the SYS.1-only workbooks
+SYS1_ONLY_COLUMNS = ('SYS.1 Req. ID', 'SYS.1 System Requirement')
+
+# Elicitation results of recent uploads keyed by the SHA-256 of the extracted text, so re-uploading the
+# same documents skips the agent; least recently used entries are dropped above ELICITATION_CACHE_SIZE
+ELICITATION_CACHE_SIZE = 64
+_elicitation_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_elicitation_cache_lock = threading.Lock()
+
+def _elicit_cached(content: str) -> Dict[str, Any]:
+    """Run the elicitation agent on the uploaded text, reusing the result for text seen recently"""
+    key = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    with _elicitation_cache_lock:
+        if key in _elicitation_cache:
+            _elicitation_cache.move_to_end(key)
+            logger.debug("Reusing elicitation result for previously uploaded content")
+            return _elicitation_cache[key]
+    result = elicitation_agent.process({'content': content, 'format': 'multi'})
+    # Only successful results are cached, so failures are retried on the next upload
+    if result.get('status') == 'success':
+        with _elicitation_cache_lock:
+            _elicitation_cache[key] = result
+            if len(_elicitation_cache) > ELICITATION_CACHE_SIZE:
+                _elicitation_cache.popitem(last=False)
+    return result
+
 # In-memory cache for last extracted requirements (REMOVING - using session instead)
 # last_elicitation_requirements = []
 
+def _status_counts(requirements: List[Dict[str, Any]]) -> Counter:
+    """Count requirements per 'req_status' in a single pass"""
+    return Counter(req.get('req_status') for req in requirements)
+
+# JSON bodies of the dashboard summary endpoints, keyed by session and the session's requirements version,
+# so repeated polls between two edits are answered without rebuilding and re-serializing the summary
+SUMMARY_CACHE_SIZE = 256
+_summary_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+def _bump_requirements_version():
+    """Mark the requirement lists in the session as changed, so cached summaries of them are not reused"""
+    session['_req_version'] = session.get('_req_version', 0) + 1
+
+def _cached_summary(name: str, build: Callable[[], Response]) -> Response:
+    """Return the cached JSON response of a summary endpoint for this session, building it with build() on a miss"""
+    key = (session.setdefault('_cache_id', uuid.uuid4().hex), session.get('_req_version', 0), name)
+    with _summary_cache_lock:
+        body = _summary_cache.get(key)
+        if body is not None:
+            _summary_cache.move_to_end(key)
+            return Response(body, mimetype='application/json')
+    response = build()
+    # Only successful responses are cached
+    if response.status_code == 200:
+        with _summary_cache_lock:
+            _summary_cache[key] = response.get_data()
+            if len(_summary_cache) > SUMMARY_CACHE_SIZE:
+                _summary_cache.popitem(last=False)
+    return response
+
 @app.route('/')
 def index():
     """Landing page with agent selector interface"""
@@ -51,15 +311,16 @@ def index():
 
     # Calculate status for Agent 1 (Elicitation)
     total_sys1_reqs = len(sys1_requirements)
-    approved_sys1_count = sum(1 for req in sys1_requirements if req.get('req_status') == 'Approved')
-    rejected_sys1_count = sum(1 for req in sys1_requirements if req.get('req_status') == 'Rejected')
+    status_counts = _status_counts(sys1_requirements)
+    approved_sys1_count = status_counts['Approved']
+    rejected_sys1_count = status_counts['Rejected']
     draft_sys1_count = total_sys1_reqs - approved_sys1_count - rejected_sys1_count
 
     agent1_status = f"{total_sys1_reqs} requirements extracted. ({approved_sys1_count} Approved, {rejected_sys1_count} Rejected, {draft_sys1_count} Draft)" if total_sys1_reqs > 0 else "Ready for inputs."
 
     # Placeholder status for other agents (can be made dynamic later)
     agent2_status = "Under Development" # Check for SYS.2 draft data in session if available
-    agent3_status = f"{sum(1 for req in sys1_requirements if req.get('req_status') == 'Draft')} items need refinement" if draft_sys1_count > 0 else "Ready for review"
+    agent3_status = f"{status_counts['Draft']} items need refinement" if draft_sys1_count > 0 else "Ready for review"
     agent4_status = "Under Development" # Check for generated test cases in session if available
 
     return render_template('index.html', 
@@ -75,7 +336,7 @@ def agent_dashboard(agent_id):
     if agent_id == '1':
         # Load SYS.1 requirements from session for Agent 1 dashboard display
         sys1_requirements = session.get('sys1_elicitation_requirements', [])
-        print(f"[DEBUG] SYS.1 Requirements loaded from session for Agent 1: {len(sys1_requirements)} requirements") # Debug print
+        logger.debug("SYS.1 Requirements loaded from session for Agent 1: %s requirements", len(sys1_requirements)) # Debug print
         # Pass only SYS.1 requirements to the template
         return render_template('agent1/dashboard.html', initial_requirements=sys1_requirements)
     elif agent_id == '4':
@@ -87,8 +348,8 @@ def agent_dashboard(agent_id):
                                agent_description=testgen_agent.agent_description,
                                default_input_path=testgen_agent.default_input_path,
                                # Pass any existing loaded requirements or generated test cases from session
-                               loaded_requirements=session.get('agent4_requirements', []),
-                               generated_test_cases=session.get('agent4_test_cases', [])
+                               loaded_requirements=agent4_store.get('requirements', []),
+                               generated_test_cases=agent4_store.get_test_cases()
                               )
     else:
         # Other agents can be handled here if they need initial data loaded
@@ -98,61 +359,135 @@ def agent_dashboard(agent_id):
 def traceability_dashboard():
     return render_template('traceability_dashboard/dashboard.html')
 
+def _upload_path(filename: str) -> str:
+    """Path in the upload folder for an uploaded file name, with directory parts and unsafe characters removed"""
+    safe_name = secure_filename(filename)
+    if not os.path.splitext(safe_name)[1] and '.' in filename:
+        # Only the extension survived (e.g. a non-ASCII name); keep it so the readers can still pick a parser
+        safe_name = 'upload.' + secure_filename(filename.rsplit('.', 1)[-1])
+    return os.path.join(app.config['UPLOAD_FOLDER'], safe_name or 'upload')
+
+def _save_upload(file, path: str):
+    """Copy an uploaded file to disk in chunks, so memory use stays bounded for large uploads"""
+    # The chunks are already large, so the file is opened unbuffered to skip an extra copy per write
+    with open(path, 'wb', buffering=0) as dst:
+        shutil.copyfileobj(file.stream, dst, length=UPLOAD_COPY_CHUNK_SIZE)
+
+def _extract_txt(filename: str) -> str:
+    with open(filename, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read() + '\n'
+
+def _extract_pdf(filename: str) -> str:
+    if fitz is not None:
+        try:
+            # PyMuPDF (MuPDF C engine) extracts text much faster than PyPDF2
+            with fitz.open(filename) as pdf_doc:
+                return ''.join(page.get_text('text') + '\n' for page in pdf_doc)
+        except Exception as e:
+            # PyMuPDF could not parse this PDF; fall back to PyPDF2
+            logger.warning("PyMuPDF extraction failed for %s, using PyPDF2: %s", os.path.basename(filename), e)
+    with open(filename, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return ''.join(page.extract_text() + '\n' for page in reader.pages)
+
+def _extract_docx(filename: str) -> str:
+    doc = docx_lib.Document(filename)
+    return ''.join(para.text + '\n' for para in doc.paragraphs)
+
+def _extract_xlsx(filename: str) -> str:
+    # Stream the rows as tab-separated lines instead of formatting a padded DataFrame table
+    return ''.join('\t'.join('' if cell is None else str(cell) for cell in row) + '\n'
+                   for row in iter_excel_rows(filename))
+
+def _extract_csv(filename: str) -> str:
+    # CSV is already text; it is passed on as read
+    return _extract_txt(filename)
+
+def _extract_pptx(filename: str) -> str:
+    prs = pptx.Presentation(filename)
+    return ''.join(shape.text + '\n' for slide in prs.slides for shape in slide.shapes if hasattr(shape, 'text'))
+
+def _extract_eml(filename: str) -> str:
+    with open(filename, 'r', encoding='utf-8', errors='ignore') as f:
+        msg = email.message_from_file(f)
+    return ''.join(part.get_payload(decode=True).decode(errors='ignore') + '\n'
+                   for part in msg.walk() if part.get_content_type() == 'text/plain')
+
+def _extract_msg(filename: str) -> str:
+    msg = extract_msg.Message(filename)
+    return msg.body + '\n'
+
+# Text extractor for each uploaded file extension; other extensions are read as plain text
+# Add more handlers for Jira/Confluence as needed
+EXTRACTORS: Dict[str, Callable[[str], str]] = {
+    'txt': _extract_txt,
+    'pdf': _extract_pdf,
+    'docx': _extract_docx,
+    'xlsx': _extract_xlsx,
+    'csv': _extract_csv,
+    'ppt': _extract_pptx,
+    'pptx': _extract_pptx,
+    'eml': _extract_eml,
+    'msg': _extract_msg,
+}
+
+def _extract_text(filename: str, ext: str) -> str:
+    """Extract the text of one uploaded file, choosing the reader from its extension"""
+    return EXTRACTORS.get(ext, _extract_txt)(filename)
+
+def _write_sys1_only_xlsx(sys1_reqs: List[Dict[str, Any]], excel_file_path: str):
+    """Write the SYS.1 IDs and requirements to a workbook"""
+    # Stream the rows to the workbook; constant_memory flushes each row as it is written
+    workbook = xlsxwriter.Workbook(excel_file_path, {'constant_memory': True, 'strings_to_urls': False})
+    worksheet = workbook.add_worksheet('Sheet1')
+    worksheet.write_row(0, 0, SYS1_ONLY_COLUMNS)
+    for row_num, req in enumerate(sys1_reqs, 1):
+        worksheet.write_row(row_num, 0, (req.get('sys1_id', ''), req.get('sys1_requirement', '')))
+    workbook.close()
+
+def _export_sys1_xlsx(sys1_reqs: List[Dict[str, Any]], excel_file_path: str):
+    """Write the SYS.1 IDs and requirements to the automatic-export workbook (run in a background thread)"""
+    try:
+        os.makedirs(os.path.dirname(excel_file_path), exist_ok=True) # Create Inputs directory if it doesn't exist
+        _write_sys1_only_xlsx(sys1_reqs, excel_file_path)
+        logger.info("Successfully exported SYS.1 requirements to %s", excel_file_path)
+    except Exception as e:
+        logger.error("Failed to automatically export SYS.1 requirements: %s", e)
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """Handle file uploads for all agents and extract SYS.1 requirements for Agent 1"""
     # global last_elicitation_requirements # REMOVING
     files = request.files.getlist('file')
     raw_content = request.form.get('raw_content', '')
-    all_text = ''
+    # Files are saved here in the request thread; their text is then extracted concurrently, since the
+    # PDF/Office/Excel parsers spend most of their time in native code or file I/O
+    saved_files = []
     for file in files:
         if file.filename == '':
             continue
-        filename = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filename)
+        filename = _upload_path(file.filename)
+        _save_upload(file, filename)
         ext = file.filename.split('.')[-1].lower()
+        saved_files.append((file.filename, filename, ext))
+
+    def extract(saved_file):
+        original_name, filename, ext = saved_file
         try:
-            if ext == 'txt':
-                with open(filename, 'r', encoding='utf-8', errors='ignore') as f:
-                    all_text += f.read() + '\n'
-            elif ext == 'pdf':
-                import PyPDF2
-                with open(filename, 'rb') as f:
-                    reader = PyPDF2.PdfReader(f)
-                    for page in reader.pages:
-                        all_text += page.extract_text() + '\n'
-            elif ext == 'docx':
-                import docx
-                doc = docx.Document(filename)
-                for para in doc.paragraphs:
-                    all_text += para.text + '\n'
-            elif ext in ['xlsx', 'csv']:
-                df = pd.read_excel(filename) if ext == 'xlsx' else pd.read_csv(filename)
-                all_text += df.to_string(index=False) + '\n'
-            elif ext in ['ppt', 'pptx']:
-                prs = pptx.Presentation(filename)
-                for slide in prs.slides:
-                    for shape in slide.shapes:
-                        if hasattr(shape, 'text'):
-                            all_text += shape.text + '\n'
-            elif ext == 'eml':
-                msg = email.message_from_file(open(filename, 'r', encoding='utf-8', errors='ignore'))
-                for part in msg.walk():
-                    if part.get_content_type() == 'text/plain':
-                        all_text += part.get_payload(decode=True).decode(errors='ignore') + '\n'
-            elif ext == 'msg':
-                msg = extract_msg.Message(filename)
-                all_text += msg.body + '\n'
-            # Add more handlers for Jira/Confluence as needed
-            else:
-                with open(filename, 'r', encoding='utf-8', errors='ignore') as f:
-                    all_text += f.read() + '\n'
+            return _extract_text(filename, ext)
         except Exception as e:
-            all_text += f'\n[Error reading {file.filename}: {e}]\n'
+            return f'\n[Error reading {original_name}: {e}]\n'
+
+    # Extracted text pieces in upload order, joined once at the end instead of growing one string
+    parts: List[str] = []
+    if saved_files:
+        with ThreadPoolExecutor(max_workers=min(8, len(saved_files))) as executor:
+            parts.extend(executor.map(extract, saved_files))
     if raw_content:
-        all_text += raw_content + '\n'
+        parts.append(raw_content + '\n')
+    all_text = ''.join(parts)
     try:
-        result = elicitation_agent.process({'content': all_text, 'format': 'multi'})
+        result = _elicit_cached(all_text)
         if result.get('status') == 'success':
             customer_reqs = result.get('customer_requirements', [])
             sys1_reqs = result.get('sys1_requirements', [])
@@ -160,39 +495,25 @@ def upload_file():
             # Store both lists in the session
             session['customer_elicitation_requirements'] = customer_reqs
             session['sys1_elicitation_requirements'] = sys1_reqs
+            # Position of each SYS.1 / customer requirement in its list, for O(1) updates by ID
+            session['sys1_index'] = _build_index(sys1_reqs, 'sys1_id')
+            session['customer_index'] = _build_index(customer_reqs, 'customer_id')
+            _bump_requirements_version()
 
-            print(f"[DEBUG] Customer Requirements saved to session: {len(customer_reqs)} requirements") # Debug print
-            print(f"[DEBUG] SYS.1 Requirements saved to session: {len(sys1_reqs)} requirements") # Debug print
+            logger.debug("Customer Requirements saved to session: %s requirements", len(customer_reqs)) # Debug print
+            logger.debug("SYS.1 Requirements saved to session: %s requirements", len(sys1_reqs)) # Debug print
 
             # --- Automatic Export of SYS.1 Requirements Only to XLSX ----
-            try:
-                # Use the sys1_reqs directly, no need to get from session again immediately
-                sys1_only_data = [{
-                    'SYS.1 Req. ID': req.get('sys1_id', ''),
-                    'SYS.1 System Requirement': req.get('sys1_requirement', '')
-                } for req in sys1_reqs]
-
-                if sys1_only_data:
-                    df = pd.DataFrame(sys1_only_data)
-
-                    # Define the path to save the file in the root directory
-                    # Get the directory where app.py is located (assuming it's the root for now)
-                    root_path = os.path.dirname(os.path.abspath(__file__))
-                    # Define the path to save the file in the Inputs directory
-                    inputs_dir = os.path.join(root_path, 'Inputs')
-                    os.makedirs(inputs_dir, exist_ok=True) # Create Inputs directory if it doesn't exist
-                    excel_file_path = os.path.join(inputs_dir, 'sys1_requirements.xlsx')
-
-                    df.to_excel(excel_file_path, index=False)
-                    print(f"[INFO] Successfully exported SYS.1 requirements to {excel_file_path}")
-                    file_export_message = f'SYS.1 requirements exported to {excel_file_path}'
-
-            except Exception as e:
-                print(f"[ERROR] Failed to automatically export SYS.1 requirements: {e}")
-                # Add an error message to activity feed (optional)
-                # if 'activity_messages' in session:
-                #     session['activity_messages'].append(f'Failed to export SYS.1 requirements: {e}')
-                #     session.modified = True
+            # Use the sys1_reqs directly, no need to get from session again immediately
+            if sys1_reqs:
+                # Define the path to save the file in the root directory
+                # Get the directory where app.py is located (assuming it's the root for now)
+                root_path = os.path.dirname(os.path.abspath(__file__))
+                # Define the path to save the file in the Inputs directory
+                excel_file_path = os.path.join(root_path, 'Inputs', 'sys1_requirements.xlsx')
+                # The workbook is written in the background so the upload response is not held up by disk I/O
+                threading.Thread(target=_export_sys1_xlsx, args=(list(sys1_reqs), excel_file_path), daemon=True).start()
+                file_export_message = f'SYS.1 requirements are being exported to {excel_file_path}, check terminal for status.'
             # --- End Automatic Export ---
 
             # Return SYS.1 requirements for immediate display on Agent 1 page
@@ -204,9 +525,6 @@ def upload_file():
             # Add the file export message if it was set
             if 'file_export_message' in locals():
                  response_data['file_export_message'] = file_export_message
-            elif 'excel_file_path' in locals():
-                 # If export path was determined but failed, maybe provide a generic message
-                 response_data['file_export_message'] = f'Attempted to export SYS.1 requirements to {excel_file_path}, check terminal for status.'
 
             return jsonify(response_data)
         else:
@@ -280,49 +598,63 @@ def all_agents_process():
         file = request.files['file']
         if file.filename == '':
             return jsonify({'error': 'No selected file'}), 400
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
+        filepath = _upload_path(file.filename)
+        _save_upload(file, filepath)
 
         results = {}
         # 2. Agent 1: Elicitation (SYS.1)
         try:
             sys1_result = elicitation_agent.process({'file_path': filepath})
-            results['sys1'] = {'result': str(sys1_result)}
+            results['sys1'] = {'result': sys1_result}
         except Exception as e:
             results['sys1'] = {'error': str(e)}
 
         # 3. Agent 2: SYS.2 Drafting
         try:
             sys2_result = sys2_agent.process({'requirements': sys1_result})
-            results['sys2'] = {'result': str(sys2_result)}
+            results['sys2'] = {'result': sys2_result}
         except Exception as e:
             results['sys2'] = {'error': str(e)}
 
         # 4. Agent 3: Review
         try:
             review_result = review_agent.process({'requirements': sys2_result})
-            results['review'] = {'result': str(review_result)}
+            results['review'] = {'result': review_result}
         except Exception as e:
             results['review'] = {'error': str(e)}
 
         # 5. Agent 2: SYS.2 Final Drafting (if needed, can be same as previous)
         try:
             sys2_final_result = sys2_agent.process({'requirements': review_result})
-            results['sys2_final'] = {'result': str(sys2_final_result)}
+            results['sys2_final'] = {'result': sys2_final_result}
         except Exception as e:
             results['sys2_final'] = {'error': str(e)}
 
         # 6. Agent 4: SYS.5 Test Case Generation
         try:
             sys5_result = testgen_agent.process({'requirements': sys2_final_result})
-            results['sys5'] = {'result': str(sys5_result)}
+            results['sys5'] = {'result': sys5_result}
         except Exception as e:
             results['sys5'] = {'error': str(e)}
 
-        return jsonify(results)
+        # The structured results are serialized once here; anything not JSON serializable is written as str()
+        return fast_jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+class ElicitationReportPDF(FPDF):
+    """PDF layout of the Agent 1 requirement elicitation report (title header and page-number footer)"""
+
+    def header(self):
+        self.set_font('Arial', 'B', 12)
+        self.cell(0, 10, 'Requirement Elicitation Report', 0, 1, 'C')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
+
 @app.route('/api/agent1/export/<format>', methods=['GET'])
 def export_requirements(format):
     # Load SYS.1 requirements from session for export
@@ -345,8 +677,9 @@ def export_requirements(format):
     untraced_customer_count = total_customer_reqs - traced_customer_count
 
     total_sys1_reqs = len(sys1_requirements_to_export)
-    approved_sys1_count = sum(1 for req in sys1_requirements_to_export if req.get('req_status') == 'Approved')
-    rejected_sys1_count = sum(1 for req in sys1_requirements_to_export if req.get('req_status') == 'Rejected')
+    status_counts = _status_counts(sys1_requirements_to_export)
+    approved_sys1_count = status_counts['Approved']
+    rejected_sys1_count = status_counts['Rejected']
     draft_sys1_count = total_sys1_reqs - approved_sys1_count - rejected_sys1_count
 
     summary_data = {
@@ -366,9 +699,26 @@ def export_requirements(format):
     if not sys1_requirements_to_export:
         return jsonify({'status': 'error', 'message': 'No requirements to export'}), 400
 
+    # Customer requirement text by customer ID, so each trace is a single dict lookup
+    customer_texts = {cid: cust_req.get('customer_requirement', '') for cid, cust_req in customer_map.items()}
+
+    # Each requirement with its traced customer IDs and linked customer requirement texts, joined once for
+    # every format (texts are separated by semicolons if multiple traces exist)
+    augmented_requirements = [
+        (
+            req,
+            ', '.join(req.get('customer_trace_ids', [])),
+            '; '.join(customer_texts.get(cid, '') for cid in req.get('customer_trace_ids', []))
+        )
+        for req in sys1_requirements_to_export
+    ]
+
     if format == 'csv':
-        output = io.StringIO()
-        writer = csv.writer(output)
+        # Encode the CSV straight into the bytes buffer that is sent, instead of building a str and encoding a copy.
+        # The wrapper batches rows into chunks, so the buffer grows in a few large writes rather than one per row
+        output = io.BytesIO()
+        text_output = io.TextIOWrapper(output, encoding='utf-8', newline='')
+        writer = csv.writer(text_output)
         # Add Summary Section to CSV
         writer.writerow(['Summary:'])
         writer.writerow(['Customer Traceability', '', 'SYS.1 Status'])
@@ -379,16 +729,11 @@ def export_requirements(format):
         writer.writerow([]) # Add an empty row for separation
 
         # Add Table Headers to CSV
-        writer.writerow(['Customer Req. ID(s)', 'Customer Requirement', 'SYS.1 Req. ID', 'SYS.1 System Requirement', 'Domain', 'Priority', 'Rationale', 'Requirement Status'])
-        for req in sys1_requirements_to_export:
-            # Get linked customer requirement text (joining if multiple traces exist)
-            customer_req_texts = [
-                customer_map.get(cid, {}).get('customer_requirement', '')
-                for cid in req.get('customer_trace_ids', [])
-            ]
+        writer.writerow(SYS1_EXPORT_HEADERS)
+        for req, customer_ids, customer_req_text in augmented_requirements:
             writer.writerow([
-                ', '.join(req.get('customer_trace_ids', [])),
-                '; '.join(customer_req_texts), # Use semicolon to separate texts if multiple
+                customer_ids,
+                customer_req_text,
                 req.get('sys1_id', ''),
                 req.get('sys1_requirement', ''),
                 req.get('domain', ''),
@@ -396,60 +741,34 @@ def export_requirements(format):
                 req.get('rationale', ''),
                 req.get('req_status', 'Draft')
             ])
+        text_output.detach() # Flushes the last chunk, keeping the buffer open when the wrapper is discarded
         output.seek(0)
-        return send_file(io.BytesIO(output.getvalue().encode('utf-8')), mimetype='text/csv', as_attachment=True, download_name='elicitation_requirements.csv')
+        return send_file(output, mimetype='text/csv', as_attachment=True, download_name='elicitation_requirements.csv')
     elif format == 'xlsx':
-        import pandas as pd
-        # Prepare data for DataFrame, converting list of IDs to string
-        # Add Customer Requirement columns to DataFrame data
-        df_data = []
-        for req in sys1_requirements_to_export:
-            req_copy = req.copy()
-            req_copy['Customer Req. ID(s)'] = ', '.join(req_copy.get('customer_trace_ids', []))
-            # Get linked customer requirement text
-            customer_req_texts = [
-                customer_map.get(cid, {}).get('customer_requirement', '') for cid in req.get('customer_trace_ids', [])
-            ]
-            req_copy['Customer Requirement'] = '; '.join(customer_req_texts)
-            # Rename existing keys to match desired output headers if necessary, or add new ones
-            req_copy['SYS.1 Req. ID'] = req_copy.pop('sys1_id', '')
-            req_copy['SYS.1 System Requirement'] = req_copy.pop('sys1_requirement', '')
-            req_copy['Domain'] = req_copy.pop('domain', '')
-            req_copy['Priority'] = req_copy.pop('priority', '')
-            req_copy['Rationale'] = req_copy.pop('rationale', '')
-            req_copy['Requirement Status'] = req_copy.pop('req_status', '')
-            # Remove internal keys not needed in export
-            req_copy.pop('customer_trace_ids', None)
-            df_data.append(req_copy)
-        # Debugging: Print df_data before creating DataFrame
-        print("[DEBUG] Data for XLSX DataFrame:", df_data)
-        df = pd.DataFrame(df_data)
-        # Reorder columns to match desired export format (Customer Req. first)
-        # Temporarily simplify columns for debugging XLSX export issue
-        cols = ['SYS.1 Req. ID', 'SYS.1 System Requirement'] # Simplified columns for testing
-        df = df.reindex(columns=cols)
+        # Stream both sheets row by row; constant_memory flushes each row as it is written
         output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Add Summary Sheet to XLSX
-            summary_df = pd.DataFrame({
-                'Summary Type': ['Customer Traceability', '', 'SYS.1 Status', '', ''],
-                'Metric': ['Total Customer Req.', 'Traced to SYS.1', 'Not Traced to SYS.1', 'Total SYS.1 Req.', 'SYS.1 Approved', 'SYS.1 Rejected', 'SYS.1 Draft'],
-                'Count': [
-                    summary_data['customer_traceability']['total'],
-                    summary_data['customer_traceability']['traced'],
-                    summary_data['customer_traceability']['untraced'],
-                    summary_data['sys1_status']['total'],
-                    summary_data['sys1_status']['approved'],
-                    summary_data['sys1_status']['rejected'],
-                    summary_data['sys1_status']['draft']
-                ]
-            })
-            summary_df.to_excel(writer, sheet_name='Summary', index=False)
-
-            df.to_excel(writer, index=False, sheet_name='SYS1 Requirements')
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_urls': False})
+        # Add Summary Sheet to XLSX
+        summary_sheet = workbook.add_worksheet('Summary')
+        summary_sheet.write_row(0, 0, ('Summary Type', 'Metric', 'Count'))
+        summary_rows = (
+            ('Customer Traceability', 'Total Customer Req.', summary_data['customer_traceability']['total']),
+            ('', 'Traced to SYS.1', summary_data['customer_traceability']['traced']),
+            ('', 'Not Traced to SYS.1', summary_data['customer_traceability']['untraced']),
+            ('SYS.1 Status', 'Total SYS.1 Req.', summary_data['sys1_status']['total']),
+            ('', 'SYS.1 Approved', summary_data['sys1_status']['approved']),
+            ('', 'SYS.1 Rejected', summary_data['sys1_status']['rejected']),
+            ('', 'SYS.1 Draft', summary_data['sys1_status']['draft'])
+        )
+        for row_num, row in enumerate(summary_rows, 1):
+            summary_sheet.write_row(row_num, 0, row)
+        # The requirements sheet has the SYS.1 ID and requirement columns
+        requirements_sheet = workbook.add_worksheet('SYS1 Requirements')
+        requirements_sheet.write_row(0, 0, SYS1_ONLY_COLUMNS)
+        for row_num, (req, _, _) in enumerate(augmented_requirements, 1):
+            requirements_sheet.write_row(row_num, 0, (req.get('sys1_id', ''), req.get('sys1_requirement', '')))
+        workbook.close()
         output.seek(0)
-        # Ensure the BytesIO object is ready to be read from the beginning
-        output.seek(0) # Add this line to reset the stream position to the beginning
         return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', as_attachment=True, download_name='elicitation_requirements.xlsx')
     elif format == 'docx':
         doc = docx_lib.Document()
@@ -465,17 +784,16 @@ def export_requirements(format):
 
         doc.add_heading('SYS.1 Requirements', level=1)
         # Add Table Headers to DOCX
-        table = doc.add_table(rows=1, cols=8) # 8 columns now
+        table = doc.add_table(rows=1, cols=len(SYS1_EXPORT_HEADERS)) # 8 columns now
         table.style = 'Table Grid' # Apply a grid style for better visibility
         hdr_cells = table.rows[0].cells
-        headers = ['Customer Req. ID(s)', 'Customer Requirement', 'SYS.1 Req. ID', 'SYS.1 System Requirement', 'Domain', 'Priority', 'Rationale', 'Requirement Status']
-        for i, header in enumerate(headers):
+        for i, header in enumerate(SYS1_EXPORT_HEADERS):
             hdr_cells[i].text = header
 
-        for req in sys1_requirements_to_export:
+        for req, customer_ids, customer_req_text in augmented_requirements:
             row_cells = table.add_row().cells
-            row_cells[0].text = ', '.join(req.get('customer_trace_ids', []))
-            row_cells[1].text = '; '.join(customer_req_texts)
+            row_cells[0].text = customer_ids
+            row_cells[1].text = customer_req_text
             row_cells[2].text = req.get('sys1_id', '')
             row_cells[3].text = req.get('sys1_requirement', '')
             row_cells[4].text = req.get('domain', '')
@@ -488,18 +806,7 @@ def export_requirements(format):
         output.seek(0)
         return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document', as_attachment=True, download_name='elicitation_requirements.docx')
     elif format == 'pdf':
-        class PDF(FPDF):
-            def header(self):
-                self.set_font('Arial', 'B', 12)
-                self.cell(0, 10, 'Requirement Elicitation Report', 0, 1, 'C')
-                self.ln(5)
-
-            def footer(self):
-                self.set_y(-15)
-                self.set_font('Arial', 'I', 8)
-                self.cell(0, 10, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
-
-        pdf = PDF()
+        pdf = ElicitationReportPDF()
         pdf.alias_nb_pages()
         pdf.add_page()
         pdf.set_auto_page_break(auto=True, margin=15)
@@ -510,32 +817,23 @@ def export_requirements(format):
         pdf.ln(2)
 
         # Table Section
-        headers = ['Customer Req. ID(s)', 'Customer Req.', 'SYS.1 Req. ID', 'SYS.1 System Req.', 'Domain', 'Priority', 'Rationale', 'Status']
-        col_widths = [30, 50, 20, 50, 20, 20, 40, 20]
-
-        pdf.set_font('Arial', 'B', 10)
-        for i, header in enumerate(headers):
-            pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
-        pdf.ln()
 
+        # fpdf2 table: one call per row, with the column widths used as proportions of the page width and
+        # long texts wrapped inside their cells; the first row is rendered as the (bold) header
         pdf.set_font('Arial', '', 8)
-        for req in sys1_requirements_to_export:
-            customer_req_texts = [
-                customer_map.get(cid, {}).get('customer_requirement', '') for cid in req.get('customer_trace_ids', [])
-            ]
-            cell_data = [
-                ', '.join(req.get('customer_trace_ids', [])),
-                '; '.join(customer_req_texts),
-                req.get('sys1_id', ''),
-                req.get('sys1_requirement', ''),
-                req.get('domain', ''),
-                req.get('priority', ''),
-                req.get('rationale', ''),
-                req.get('req_status', 'Draft')
-            ]
-            for i, data in enumerate(cell_data):
-                pdf.cell(col_widths[i], 10, str(data), 1, 0, 'L')
-            pdf.ln()
+        with pdf.table(col_widths=SYS1_PDF_COL_WIDTHS, text_align='LEFT') as table:
+            table.row(SYS1_PDF_HEADERS)
+            for req, customer_ids, customer_req_text in augmented_requirements:
+                table.row([str(data) for data in (
+                    customer_ids,
+                    customer_req_text,
+                    req.get('sys1_id', ''),
+                    req.get('sys1_requirement', ''),
+                    req.get('domain', ''),
+                    req.get('priority', ''),
+                    req.get('rationale', ''),
+                    req.get('req_status', 'Draft')
+                )])
 
         # Add some space before the dashboard summary
         pdf.ln(8)
@@ -561,11 +859,9 @@ def export_requirements(format):
             pdf.cell(60, 8, metric, 1, 0, 'L')
             pdf.cell(40, 8, str(value), 1, 1, 'C')
 
-        output = io.BytesIO()
-        # Use dest='B' to get the raw bytes output
-        pdf_bytes = pdf.output(dest='B')
-        output.write(pdf_bytes)
-        output.seek(0)
+        # fpdf2 returns the document as a bytearray; the buffer is created from it directly instead of
+        # being written into an empty one
+        output = io.BytesIO(pdf.output())
         return send_file(output, mimetype='application/pdf', as_attachment=True, download_name='elicitation_requirements.pdf')
     else:
         return jsonify({'status': 'error', 'message': 'Unsupported export format'}), 400
@@ -577,14 +873,6 @@ def export_sys1_only_xlsx():
     if not requirements_data:
         return jsonify({'status': 'error', 'message': 'No requirements to export.'}), 400
 
-    # Extract only SYS.1 System Requirement and SYS.1 Req. ID (for context/identifier)
-    sys1_only_data = [{
-        'SYS.1 Req. ID': req.get('sys1_id', ''),
-        'SYS.1 System Requirement': req.get('sys1_requirement', '')
-    } for req in requirements_data]
-
-    df = pd.DataFrame(sys1_only_data)
-
     # Define the path to save the file in the root directory
     # The workspace root is available from the user_info. Assuming relative path from app.py location
     # This might need adjustment based on actual app.py location relative to project root.
@@ -595,12 +883,29 @@ def export_sys1_only_xlsx():
     excel_file_path = os.path.join(root_path, 'sys1_requirements_only.xlsx')
 
     try:
-        df.to_excel(excel_file_path, index=False)
+        # Only SYS.1 Req. ID and SYS.1 System Requirement are exported, streamed row by row from the session
+        _write_sys1_only_xlsx(requirements_data, excel_file_path)
         return jsonify({'status': 'success', 'message': f'SYS.1 requirements exported to {excel_file_path}'})
     except Exception as e:
-        print(f"Error exporting SYS.1 requirements: {e}")
+        logger.error("Error exporting SYS.1 requirements: %s", e)
         return jsonify({'status': 'error', 'message': f'Failed to export SYS.1 requirements: {str(e)}'}), 500
 
+def _build_index(requirements: List[Dict[str, Any]], id_field: str) -> Dict[str, int]:
+    """Map each requirement ID (the value of id_field) to its position in the requirement list"""
+    return {req[id_field]: i for i, req in enumerate(requirements) if req.get(id_field)}
+
+def _find_indexed(requirements: List[Dict[str, Any]], id_field: str, index_key: str, req_id: str):
+    """Position of the requirement with the given ID in a session list, or None if it is not there.
+
+    Uses the ID index stored in the session under index_key; it is rebuilt if it is missing or out of date.
+    """
+    index = session.get(index_key, {}).get(req_id)
+    if index is not None and index < len(requirements) and requirements[index].get(id_field) == req_id:
+        return index
+    id_index = _build_index(requirements, id_field)
+    session[index_key] = id_index
+    return id_index.get(req_id)
+
 @app.route('/api/agent1/update_status', methods=['POST'])
 def update_requirement_status():
     # We now update SYS.1 requirements based on sys1_id
@@ -613,23 +918,27 @@ def update_requirement_status():
 
     # Load SYS.1 requirements from session
     sys1_requirements = session.get('sys1_elicitation_requirements', [])
-    for req in sys1_requirements:
-        if req.get('sys1_id') == sys1_id:
-            req['req_status'] = new_req_status
-            session['sys1_elicitation_requirements'] = sys1_requirements # Save updated list back to session
-            return jsonify({'status': 'success', 'message': f'Status updated for {sys1_id} to {new_req_status}'})
+    index = _find_indexed(sys1_requirements, 'sys1_id', 'sys1_index', sys1_id)
+    if index is not None:
+        sys1_requirements[index]['req_status'] = new_req_status
+        session.modified = True # The session list was updated in place
+        _bump_requirements_version()
+        return jsonify({'status': 'success', 'message': f'Status updated for {sys1_id} to {new_req_status}'})
     return jsonify({'status': 'error', 'message': f'SYS.1 Requirement with id {sys1_id} not found'}), 404
 
 # Add endpoint to get traceability data (from session)
 @app.route('/api/traceability_data')
 def get_traceability_data():
+    return _cached_summary('traceability_data', _build_traceability_data)
+
+def _build_traceability_data():
     # Load both customer and SYS.1 requirements from session
     customer_reqs = session.get('customer_elicitation_requirements', [])
     sys1_reqs = session.get('sys1_elicitation_requirements', [])
 
     # For the traceability dashboard, we need a combined view
     # The simplest is to send both lists and let the frontend build the view
-    return jsonify({
+    return fast_jsonify({
         'customer_requirements': customer_reqs,
         'sys1_requirements': sys1_reqs
     })
@@ -652,33 +961,38 @@ def update_requirement_details():
 
         sys1_requirements = session.get('sys1_elicitation_requirements', [])
         updated = False
-        for req in sys1_requirements:
-            if req.get('sys1_id') == sys1_id_to_update:
-                # Update fields if provided
-                if updated_customer_req is not None:
-                    req['customer_requirement'] = updated_customer_req
-                if updated_sys1_req is not None:
-                    req['sys1_requirement'] = updated_sys1_req
-                # Update other fields here
-
-                session['sys1_elicitation_requirements'] = sys1_requirements # Save updated list back to session
-                updated = True
-                break
+        index = _find_indexed(sys1_requirements, 'sys1_id', 'sys1_index', sys1_id_to_update)
+        if index is not None:
+            req = sys1_requirements[index]
+            # Update fields if provided
+            if updated_customer_req is not None:
+                req['customer_requirement'] = updated_customer_req
+            if updated_sys1_req is not None:
+                req['sys1_requirement'] = updated_sys1_req
+            # Update other fields here
+
+            session.modified = True # The session list was updated in place
+            _bump_requirements_version()
+            updated = True
 
         if updated:
             # Also find the corresponding customer requirement and update it if needed
             # This assumes a 1:1 relationship or that the customer requirement text needs syncing
             # If 1:Many, this logic might need adjustment based on how customer_requirements are managed
             customer_requirements = session.get('customer_elicitation_requirements', [])
-            for cust_req in customer_requirements:
-                # Find the corresponding customer requirement by checking if its ID is in the sys1_req's customer_trace_ids
-                # This handles both 1:1 and 1:Many traceability from the customer side to the SYS.1 side.
-                # Note: This assumes sys1_req has a customer_trace_ids list
-                if cust_req.get('customer_id') in req.get('customer_trace_ids', []):
-                    if updated_customer_req is not None:
-                        cust_req['customer_requirement'] = updated_customer_req
-                    session['customer_elicitation_requirements'] = customer_requirements # Save updated list
-                    break # Assuming one customer req per sys1 trace for simplicity here
+            # Find the corresponding customer requirement through the IDs in the sys1_req's customer_trace_ids
+            # This handles both 1:1 and 1:Many traceability from the customer side to the SYS.1 side.
+            # Note: This assumes sys1_req has a customer_trace_ids list
+            trace_indexes = [
+                _find_indexed(customer_requirements, 'customer_id', 'customer_index', cust_id)
+                for cust_id in req.get('customer_trace_ids', [])
+            ]
+            trace_indexes = [i for i in trace_indexes if i is not None]
+            if trace_indexes:
+                # Assuming one customer req per sys1 trace for simplicity here (the first one in the list)
+                cust_req = customer_requirements[min(trace_indexes)]
+                if updated_customer_req is not None:
+                    cust_req['customer_requirement'] = updated_customer_req
 
             return jsonify({'status': 'success', 'message': f'Requirement {sys1_id_to_update} updated.'})
         else:
@@ -693,74 +1007,104 @@ def submit_feedback():
     data = request.json
     feedback = data.get('feedback')
     page = data.get('page', 'Unknown Page')
-    print(f"Feedback from {page}: {feedback}")
+    logger.info("Feedback from %s: %s", page, feedback)
     return jsonify({'status': 'success', 'message': 'Feedback received, thank you!'})
 
 # Agent 2 Routes
+def _agent2_automatic_file_input():
+    logger.debug("Automatic file source requested.") # Added log
+    # Define the automatic file path
+    root_path = os.path.dirname(os.path.abspath(__file__))
+    automatic_file_path = os.path.join(root_path, 'Inputs', 'sys1_requirements.xlsx')
+    logger.debug("Expected automatic file path: %s", automatic_file_path) # Added log
+    if not os.path.exists(automatic_file_path):
+         logger.debug("Automatic file not found.") # Added log
+         return jsonify({'status': 'error', 'message': f'Automatic file not found at {automatic_file_path}'}), 404
+    input_data = {'file_path': automatic_file_path, 'source': 'automatic'}
+    logger.debug("Processed automatic file source: %s", input_data) # Added log
+    return input_data
+
+def _agent2_session_input():
+    logger.debug("Session source requested.") # Added log
+    # In this case, Sys2Agent should read from the session
+    input_data = {'source': 'session'}
+    logger.debug("Processed session source: %s", input_data) # Added log
+    return input_data
+
+# Agent 2 input for each value of the 'source' form field; each handler returns the input data or an error response
+_AGENT2_SOURCE_HANDLERS = {
+    'automatic_file': _agent2_automatic_file_input,
+    'session': _agent2_session_input,
+}
+
 @app.route('/api/agent2/process', methods=['POST'])
 def process_sys1_for_agent2():
-    print("[DEBUG] /api/agent2/process endpoint hit.") # Added log
+    logger.debug("/api/agent2/process endpoint hit.") # Added log
     try:
+        # The form fields that select the input are read once
+        form = request.form
+        source = form.get('source')
+        raw_content = form.get('raw_content')
+
         # Check if a file was uploaded
         if 'file' in request.files:
-            print("[DEBUG] File upload detected.") # Added log
+            logger.debug("File upload detected.") # Added log
             file = request.files['file']
             if file.filename == '':
-                print("[DEBUG] No selected file for upload.") # Added log
+                logger.debug("No selected file for upload.") # Added log
                 return jsonify({'error': 'No selected file for upload'}), 400
             # Save the uploaded file temporarily
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-            file.save(filepath)
+            filepath = _upload_path(file.filename)
+            _save_upload(file, filepath)
             input_data = {'file_path': filepath, 'source': 'upload'}
-            print(f"[DEBUG] Processed file upload: {input_data}") # Added log
+            logger.debug("Processed file upload: %s", input_data) # Added log
 
-        # Check if processing the automatic file is requested
-        elif request.form.get('source') == 'automatic_file':
-            print("[DEBUG] Automatic file source requested.") # Added log
-            # Define the automatic file path
-            root_path = os.path.dirname(os.path.abspath(__file__))
-            automatic_file_path = os.path.join(root_path, 'Inputs', 'sys1_requirements.xlsx')
-            print(f"[DEBUG] Expected automatic file path: {automatic_file_path}") # Added log
-            if not os.path.exists(automatic_file_path):
-                 print("[DEBUG] Automatic file not found.") # Added log
-                 return jsonify({'status': 'error', 'message': f'Automatic file not found at {automatic_file_path}'}), 404
-            input_data = {'file_path': automatic_file_path, 'source': 'automatic'}
-            print(f"[DEBUG] Processed automatic file source: {input_data}") # Added log
+        # Check for a named source (the automatic file, or the session after a manual upload)
+        elif source in _AGENT2_SOURCE_HANDLERS:
+            input_data = _AGENT2_SOURCE_HANDLERS[source]()
+            if not isinstance(input_data, dict):
+                return input_data # Error response from the handler
 
         # Check for raw text input
-        elif request.form.get('raw_content'):
-            print("[DEBUG] Raw text input detected.") # Added log
-            raw_content = request.form.get('raw_content')
+        elif raw_content:
+            logger.debug("Raw text input detected.") # Added log
             input_data = {'raw_content': raw_content, 'source': 'raw_text'}
-            print(f"[DEBUG] Processed raw text input: {input_data}") # Added log
-
-        # Check for session source (used by manual input after upload)
-        elif request.form.get('source') == 'session':
-             print("[DEBUG] Session source requested.") # Added log
-             # In this case, Sys2Agent should read from the session
-             input_data = {'source': 'session'}
-             print(f"[DEBUG] Processed session source: {input_data}") # Added log
+            logger.debug("Processed raw text input: %s", input_data) # Added log
 
         else:
-            print("[DEBUG] No valid input source provided.") # Added log
+            logger.debug("No valid input source provided.") # Added log
             return jsonify({'status': 'error', 'message': 'No input provided (file, automatic_file request, raw_content, or session)'}), 400
 
+        # Run Agent 2 in the background and let the client poll /api/jobs/<job_id> when asked to
+        if _wants_background_job():
+            return _background_job_response('agent2', sys2_agent.process_sys1_input, input_data)
+
         # Initialize and run Agent 2
-        print("[DEBUG] Initializing Sys2Agent.") # Added log
+        logger.debug("Initializing Sys2Agent.") # Added log
         process_result = sys2_agent.process_sys1_input(input_data)
+        return _store_agent2_result(process_result)
 
+    except Exception as e:
+        logger.error("Error in /api/agent2/process endpoint: %s", e) # Added log
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def _store_agent2_result(process_result: Dict[str, Any]):
+    """Store the result of Agent 2 in the session and build the response of /api/agent2/process"""
+    try:
         # Assuming process_result contains sys2_requirements, dependencies, etc.
-        print(f"[DEBUG] Sys2Agent process_sys1_input returned: {process_result.get('status')}") # Added log
+        logger.debug("Sys2Agent process_sys1_input returned: %s", process_result.get('status')) # Added log
         if process_result and process_result.get('status') == 'success':
              # Store results in session
              session['sys2_requirements'] = process_result.get('sys2_requirements', [])
+             session['sys2_index'] = _build_index(session['sys2_requirements'], 'sys2_id')
              session['dependencies'] = process_result.get('dependencies', [])
              # Store other results as needed (e.g., classification, verification mapping)
              session['sys2_classification'] = process_result.get('classification', {})
              session['sys2_verification_mapping'] = process_result.get('verification_mapping', {})
+             _bump_requirements_version()
 
-             print("[DEBUG] SYS.2 data stored in session.") # Added log
-             return jsonify({
+             logger.debug("SYS.2 data stored in session.") # Added log
+             return fast_jsonify({
                  'status': 'success',
                  'message': 'SYS.2 requirements and data generated.',
                  'sys2_requirements': session['sys2_requirements'],
@@ -769,11 +1113,11 @@ def process_sys1_for_agent2():
                  'verification_mapping': session['sys2_verification_mapping']
              })
         else:
-             print("[DEBUG] Agent 2 processing failed.") # Added log
+             logger.debug("Agent 2 processing failed.") # Added log
              return jsonify({'status': 'error', 'message': process_result.get('message', 'Agent 2 processing failed.')}), 500
 
     except Exception as e:
-        print(f"[DEBUG] Error in /api/agent2/process endpoint: {e}") # Added log
+        logger.error("Error in /api/agent2/process endpoint: %s", e) # Added log
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/api/agent2/update_requirement', methods=['POST'])
@@ -791,23 +1135,20 @@ def update_sys2_requirement():
         updated = False
 
         # Find and update the requirement
-        for req in sys2_requirements:
-            if req.get('sys2_id') == sys2_id_to_update:
-                for field, value in updates.items():
-                    req[field] = value
-                updated = True
-                break
+        index = _find_indexed(sys2_requirements, 'sys2_id', 'sys2_index', sys2_id_to_update)
+        if index is not None:
+            sys2_requirements[index].update(updates)
+            updated = True
 
         if updated:
-            # Save the updated list back to session
-            session['sys2_requirements'] = sys2_requirements
-            session.modified = True # Mark session as modified
+            session.modified = True # The session list was updated in place
+            _bump_requirements_version()
             return jsonify({'status': 'success', 'message': f'Requirement {sys2_id_to_update} updated successfully.'})
         else:
             return jsonify({'status': 'error', 'message': f'Requirement with SYS.2 ID {sys2_id_to_update} not found.'}), 404
 
     except Exception as e:
-        print(f"Error updating SYS.2 requirement: {e}")
+        logger.error("Error updating SYS.2 requirement: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/api/agent2/export/<format>', methods=['GET'])
@@ -829,9 +1170,9 @@ def export_sys2_requirements(format):
             if export_data is None:
                 return jsonify({'status': 'error', 'message': 'Failed to generate export data.'}), 500
             if format == 'csv':
-                return send_file(io.BytesIO(export_data.encode('utf-8')), mimetype='text/csv', as_attachment=True, download_name='sys2_requirements.csv')
+                return send_file(export_data, mimetype='text/csv', as_attachment=True, download_name='sys2_requirements.csv')
             elif format == 'txt':
-                return send_file(io.BytesIO(export_data.encode('utf-8')), mimetype='text/plain', as_attachment=True, download_name='sys2_requirements.txt')
+                return send_file(export_data, mimetype='text/plain', as_attachment=True, download_name='sys2_requirements.txt')
             elif format == 'docx':
                 return send_file(export_data, mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document', as_attachment=True, download_name='sys2_requirements.docx')
             elif format == 'pdf':
@@ -839,9 +1180,7 @@ def export_sys2_requirements(format):
             else:
                 return jsonify({'status': 'error', 'message': f'Unsupported export format: {format}'}), 400
     except Exception as e:
-        print(f"[ERROR] Error exporting SYS.2 requirements: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error exporting SYS.2 requirements: %s", e)
         return jsonify({'status': 'error', 'message': f'Error exporting SYS.2 requirements: {str(e)}'}), 500
 
 @app.route('/api/agent2/combined_dashboard_summary', methods=['GET'])
@@ -849,32 +1188,35 @@ def get_agent2_combined_dashboard_summary():
     """
     Endpoint to provide combined summary statistics for SYS.1 and SYS.2 requirements for the Agent 2 dashboard.
     """
+    return _cached_summary('agent2_combined_dashboard_summary', _build_agent2_combined_dashboard_summary)
+
+def _build_agent2_combined_dashboard_summary():
     try:
         # Load SYS.1 and SYS.2 requirements from session
         sys1_requirements = session.get('sys1_elicitation_requirements', [])
         sys2_requirements = session.get('sys2_requirements', [])
 
         # Add print statement to check if requirements are loaded
-        print(f"[DEBUG] Combined dashboard summary request. SYS.1 requirements in session: {len(sys1_requirements) if sys1_requirements else 0}")
-        print(f"[DEBUG] Combined dashboard summary request. SYS.2 requirements in session: {len(sys2_requirements) if sys2_requirements else 0}")
+        logger.debug("Combined dashboard summary request. SYS.1 requirements in session: %s", len(sys1_requirements))
+        logger.debug("Combined dashboard summary request. SYS.2 requirements in session: %s", len(sys2_requirements))
 
         # Calculate SYS.1 summary (logic adapted from Agent 1 export endpoint)
         customer_requirements = session.get('customer_elicitation_requirements', [])
-        customer_map = {req.get('customer_id'): req for req in customer_requirements if req.get('customer_id')}
+        # Only membership of the customer IDs is needed here
+        customer_ids = {req.get('customer_id') for req in customer_requirements if req.get('customer_id')}
 
         total_customer_reqs = len(customer_requirements)
-        traced_customer_ids = set()
-        for sys1_req in sys1_requirements:
-            if sys1_req.get('customer_trace_ids'):
-                for cust_id in sys1_req['customer_trace_ids']:
-                    if cust_id in customer_map:
-                        traced_customer_ids.add(cust_id)
+        # Valid customer IDs traced by any SYS.1 requirement
+        traced_customer_ids = customer_ids.intersection(
+            cust_id for sys1_req in sys1_requirements for cust_id in (sys1_req.get('customer_trace_ids') or ())
+        )
         traced_customer_count = len(traced_customer_ids)
         untraced_customer_count = total_customer_reqs - traced_customer_count
 
         total_sys1_reqs = len(sys1_requirements)
-        approved_sys1_count = sum(1 for req in sys1_requirements if req.get('req_status') == 'Approved')
-        rejected_sys1_count = sum(1 for req in sys1_requirements if req.get('req_status') == 'Rejected')
+        status_counts = _status_counts(sys1_requirements)
+        approved_sys1_count = status_counts['Approved']
+        rejected_sys1_count = status_counts['Rejected']
         draft_sys1_count = total_sys1_reqs - approved_sys1_count - rejected_sys1_count
 
         sys1_summary = {
@@ -893,7 +1235,7 @@ def get_agent2_combined_dashboard_summary():
         sys2_summary = sys2_agent.get_dashboard_summary(sys2_requirements)
 
         # Include the full requirements lists in the summary response for the traceability table
-        return jsonify({
+        return fast_jsonify({
             'status': 'success',
             'summary': {
                 'sys1': sys1_summary,
@@ -904,7 +1246,7 @@ def get_agent2_combined_dashboard_summary():
         })
 
     except Exception as e:
-        print(f"Error fetching combined dashboard summary: {e}")
+        logger.error("Error fetching combined dashboard summary: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 # Agent 3 Routes (Placeholder)
@@ -917,8 +1259,7 @@ def review_sys2_requirements():
     if not sys2_requirements:
         return jsonify({'status': 'error', 'message': 'No SYS.2 requirements found in session.'}), 400
 
-    agent3 = ReviewAgent()
-    review_results, suggestions, test_proposals = agent3.review_requirements(sys2_requirements)
+    review_results, suggestions, test_proposals = review_agent.review_requirements(sys2_requirements)
 
     # You might want to store the review results, suggestions, and test proposals in the session
     session['review_results'] = review_results
@@ -935,32 +1276,39 @@ def review_sys2_requirements():
 
 @app.route('/api/agent3/process_sys2', methods=['POST'])
 def process_sys2():
-    print("[DEBUG] /api/agent3/process_sys2 endpoint hit.")
+    logger.debug("/api/agent3/process_sys2 endpoint hit.")
     try:
         # Check if a file was uploaded
         if 'file' in request.files:
-            print("[DEBUG] File upload detected for Agent 3.")
+            logger.debug("File upload detected for Agent 3.")
             file = request.files['file']
             if file.filename == '':
-                print("[DEBUG] No selected file for upload for Agent 3.")
+                logger.debug("No selected file for upload for Agent 3.")
                 return jsonify({'error': 'No selected file for upload'}), 400
-            # Save the uploaded file temporarily
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-            file.save(filepath)
-            input_data = {'file_path': filepath, 'source': 'upload'}
-            print(f"[DEBUG] Processed file upload for Agent 3: {input_data}")
+            if _wants_background_job():
+                # The request stream is gone once the response is sent, so background jobs read a saved copy
+                filepath = _upload_path(file.filename)
+                _save_upload(file, filepath)
+                input_data = {'file_path': filepath, 'source': 'upload'}
+            else:
+                # Parse the upload straight from the request stream, without writing it to disk and reading it back
+                input_data = {'file': file.stream, 'file_name': file.filename, 'source': 'upload'}
+            logger.debug("Processed file upload for Agent 3: %s", input_data)
 
         # Check if processing the automatic file is requested
         elif request.form.get('source') == 'automatic_file':
-            print("[DEBUG] Automatic file source requested for Agent 3.")
+            logger.debug("Automatic file source requested for Agent 3.")
             # Define the automatic file path using the user's specified path
             automatic_file_path = r'D:\AgentX\AutoTestGen_MAPS_Agents123\AutoTestGen_MAPS\Inputs\sys2_requirements.xlsx'
-            print(f"[DEBUG] Expected automatic file path for Agent 3: {automatic_file_path}")
-            if not os.path.exists(automatic_file_path):
-                 print("[DEBUG] Automatic file not found for Agent 3.")
+            logger.debug("Expected automatic file path for Agent 3: %s", automatic_file_path)
+            # A single stat; permission problems surface when the file is opened for reading
+            try:
+                os.stat(automatic_file_path)
+            except FileNotFoundError:
+                 logger.debug("Automatic file not found for Agent 3.")
                  return jsonify({'status': 'error', 'message': f'Automatic file not found at {automatic_file_path}'}), 404
             input_data = {'file_path': automatic_file_path, 'source': 'automatic'}
-            print(f"[DEBUG] Processed automatic file source for Agent 3: {input_data}")
+            logger.debug("Processed automatic file source for Agent 3: %s", input_data)
 
         # Add other potential input sources if needed (e.g., raw text, session)
         # elif request.form.get('raw_content'):
@@ -974,98 +1322,201 @@ def process_sys2():
         #      print(f"[DEBUG] Processed session source for Agent 3: {input_data}")
 
         else:
-            print("[DEBUG] No valid input source provided for Agent 3.")
+            logger.debug("No valid input source provided for Agent 3.")
             return jsonify({'status': 'error', 'message': 'No input provided (file or automatic_file request for Agent 3)'}), 400
 
-        # Initialize and run Agent 3 (ReviewAgent)
-        print("[DEBUG] Initializing ReviewAgent for Agent 3.")
-        agent3 = ReviewAgent()
-
-        requirements_to_process = []
-        processing_source = input_data.get('source', 'unknown')
+        # Run Agent 3 in the background and let the client poll /api/jobs/<job_id> when asked to
+        if _wants_background_job():
+            return _background_job_response('agent3', _run_agent3, input_data)
 
         try:
-            if processing_source == 'upload' and input_data.get('file_path'):
-                # Read requirements directly from the uploaded file within the endpoint
-                file_path = input_data.get('file_path')
-                print(f"[DEBUG] Reading requirements from uploaded file: {file_path}")
-                # Pass the file_path to the agent's method to handle reading
-                requirements_to_process = agent3._read_requirements_from_excel(file_path)
-                print(f"[DEBUG] Read {len(requirements_to_process)} requirements from uploaded file.")
-
-            elif processing_source == 'automatic_file' and input_data.get('file_path'):
-                 # Read requirements from the automatic file within the endpoint
-                 file_path = input_data.get('file_path')
-                 print(f"[DEBUG] Attempting to read automatic file: {file_path}")
-
-                 # Explicitly check if the file exists and is readable
-                 if not os.path.exists(file_path):
-                     print(f"[ERROR] Automatic file not found at {file_path}")
-                     return jsonify({'status': 'error', 'message': f'Automatic file not found at {file_path}'}), 404
-                 if not os.access(file_path, os.R_OK):
-                      print(f"[ERROR] Automatic file not readable at {file_path}")
-                      return jsonify({'status': 'error', 'message': f'Automatic file not readable at {file_path}. Check permissions.'}), 500 # Use 500 for permission errors
-
-                 print(f"[DEBUG] Automatic file found and is readable: {file_path}")
-                 # Pass the file_path to the agent's method to handle reading
-                 requirements_to_process = agent3._read_requirements_from_excel(file_path)
-                 print(f"[DEBUG] Read {len(requirements_to_process)} requirements from automatic file.")
-
-            # Add other sources if needed (e.g., session data)
-
-            if not requirements_to_process:
-                # If no requirements were read, return an error before processing
-                print("[DEBUG] No requirements read from input source.")
-                return jsonify({'status': 'error', 'message': 'Could not read requirements from the provided input.'}), 400
-
-            # Prepare input data for the ReviewAgent.process method
-            agent_process_input = {
-                'requirements': requirements_to_process,
-                'source': processing_source # Pass the original source
-                # Add other necessary input fields for the agent if required by agent3.process
-            }
-
-            print("[DEBUG] Calling ReviewAgent process with", len(requirements_to_process), "requirements.")
-            # Call the actual ReviewAgent process method with the prepared input
-            process_result = agent3.process(agent_process_input)
-
-            if process_result and process_result.get('status') == 'success':
-                 # Store results in session (using different keys for Agent 3)
-                 # Ensure these keys match what the frontend expects
-                 session['agent3_sys2_requirements'] = process_result.get('sys2_requirements_for_review', [])
-                 session['agent3_compliance_results'] = process_result.get('compliance_results', [])
-                 session['agent3_suggestions'] = process_result.get('suggestions', [])
-
-                 print("[DEBUG] Agent 3 data stored in session.")
-                 return jsonify({
-                     'status': 'success',
-                     'message': process_result.get('message', 'Agent 3 processing successful!'), # Use message from agent process if available
-                     'sys2_requirements_for_review': session['agent3_sys2_requirements'],
-                     'compliance_results': session['agent3_compliance_results'],
-                     'suggestions': session['agent3_suggestions']
-                 })
-            else:
-                 print("[DEBUG] Agent 3 processing failed in agent.process method.")
-                 # Return the specific error message from the agent's result if available
-                 error_message = process_result.get('message', 'Agent 3 processing failed.')
-                 return jsonify({'status': 'error', 'message': error_message}), 500
+            process_result = _run_agent3(input_data)
+            return _store_agent3_result(process_result)
 
         except FileNotFoundError as fnf_error:
-            print(f"[ERROR] File not found during Agent 3 processing: {fnf_error}")
-            traceback.print_exc()
+            logger.exception("File not found during Agent 3 processing: %s", fnf_error)
             return jsonify({'status': 'error', 'message': f'Error: Input file not found. {str(fnf_error)}'}), 404
+        except PermissionError as perm_error:
+            logger.error("Input file not readable during Agent 3 processing: %s", perm_error)
+            return jsonify({'status': 'error', 'message': f'Input file not readable. Check permissions. {str(perm_error)}'}), 500 # Use 500 for permission errors
         except Exception as e:
-            print(f"[ERROR] An unexpected error occurred during Agent 3 processing: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("An unexpected error occurred during Agent 3 processing: %s", e)
             return jsonify({'status': 'error', 'message': f'An error occurred during processing: {str(e)}'}), 500
 
     except Exception as e:
-        print(f"[ERROR] An error occurred in /api/agent3/process_sys2 endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("An error occurred in /api/agent3/process_sys2 endpoint: %s", e)
         return jsonify({'status': 'error', 'message': f'An error occurred in the endpoint: {str(e)}'}), 500
 
+def _run_agent3(input_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Read the SYS.2 requirements named by input_data and review them with Agent 3.
+
+    Returns the result of ReviewAgent.process, or None if no requirements could be read from the input.
+    """
+    # Run Agent 3 with the shared ReviewAgent (it keeps no per-request state)
+    agent3 = review_agent
+
+    requirements_to_process = []
+    processing_source = input_data.get('source', 'unknown')
+
+    if processing_source == 'upload' and input_data.get('file') is not None:
+        # Read requirements directly from the upload stream
+        logger.debug("Reading requirements from upload stream: %s", input_data.get('file_name'))
+        requirements_to_process = agent3._read_requirements_from_excel(input_data['file'], input_data.get('file_name'))
+        logger.debug("Read %s requirements from uploaded file.", len(requirements_to_process))
+
+    elif processing_source == 'upload' and input_data.get('file_path'):
+        # Read requirements directly from the uploaded file within the endpoint
+        file_path = input_data.get('file_path')
+        logger.debug("Reading requirements from uploaded file: %s", file_path)
+        # Pass the file_path to the agent's method to handle reading
+        requirements_to_process = agent3._read_requirements_from_excel(file_path)
+        logger.debug("Read %s requirements from uploaded file.", len(requirements_to_process))
+
+    elif processing_source == 'automatic' and input_data.get('file_path'):
+         # Read requirements from the automatic file within the endpoint
+         # (its existence was checked above; a missing or unreadable file is reported by the handlers below)
+         file_path = input_data.get('file_path')
+         logger.debug("Attempting to read automatic file: %s", file_path)
+         # Pass the file_path to the agent's method to handle reading
+         requirements_to_process = agent3._read_requirements_from_excel(file_path)
+         logger.debug("Read %s requirements from automatic file.", len(requirements_to_process))
+
+    # Add other sources if needed (e.g., session data)
+
+    if not requirements_to_process:
+        logger.debug("No requirements read from input source.")
+        return None
+
+    # Prepare input data for the ReviewAgent.process method
+    agent_process_input = {
+        'requirements': requirements_to_process,
+        'source': processing_source # Pass the original source
+        # Add other necessary input fields for the agent if required by agent3.process
+    }
+
+    logger.debug("Calling ReviewAgent process with %s requirements.", len(requirements_to_process))
+    # Call the actual ReviewAgent process method with the prepared input
+    return agent3.process(agent_process_input)
+
+def _store_agent3_result(process_result: Optional[Dict[str, Any]]):
+    """Store the result of Agent 3 in the session and build the response of /api/agent3/process_sys2"""
+    if process_result is None:
+        # If no requirements were read, return an error before processing
+        return jsonify({'status': 'error', 'message': 'Could not read requirements from the provided input.'}), 400
+
+    if process_result and process_result.get('status') == 'success':
+         # Store results in session (using different keys for Agent 3)
+         # Ensure these keys match what the frontend expects
+         session['agent3_sys2_requirements'] = process_result.get('sys2_requirements_for_review', [])
+         session['agent3_compliance_results'] = process_result.get('compliance_results', [])
+         session['agent3_suggestions'] = process_result.get('suggestions', [])
+         _bump_requirements_version()
+
+         logger.debug("Agent 3 data stored in session.")
+         return fast_jsonify({
+             'status': 'success',
+             'message': process_result.get('message', 'Agent 3 processing successful!'), # Use message from agent process if available
+             'sys2_requirements_for_review': session['agent3_sys2_requirements'],
+             'compliance_results': session['agent3_compliance_results'],
+             'suggestions': session['agent3_suggestions']
+         })
+    else:
+         logger.debug("Agent 3 processing failed in agent.process method.")
+         # Return the specific error message from the agent's result if available
+         error_message = process_result.get('message', 'Agent 3 processing failed.')
+         return jsonify({'status': 'error', 'message': error_message}), 500
+
+# Background jobs for the long-running agent endpoints. A request that sends async=1 gets 202 and a job ID
+# right away instead of holding its worker thread for the whole agent run; the client polls /api/jobs/<job_id>,
+# and the poll that finds the job finished stores the result in the session exactly as the synchronous path does.
+# A job runs in the process that accepted it. Its state is kept in Redis when the session store is Redis, so any
+# worker process (e.g. gunicorn -w 4) can answer the poll; otherwise it is kept in this process only, and async=1
+# needs a single worker process.
+JOB_WORKERS = int(os.getenv('WHALE_JOB_WORKERS', '4'))
+# Finished jobs whose result was never fetched are dropped after this many seconds
+JOB_RESULT_TTL = 3600
+_job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS)
+_jobs_redis = app.config.get('SESSION_REDIS') if Session is not None else None
+_jobs: Dict[str, Dict[str, Any]] = {}
+_jobs_lock = threading.Lock()
+
+def _save_job(job_id: str, job: Dict[str, Any]):
+    if _jobs_redis is not None:
+        _jobs_redis.setex(f"job:{job_id}", JOB_RESULT_TTL, _pack_value(job))
+        return
+    with _jobs_lock:
+        now = time.monotonic()
+        for stale_id in [jid for jid, stored in _jobs.items()
+                         if stored['status'] != 'pending' and now - stored['updated'] > JOB_RESULT_TTL]:
+            del _jobs[stale_id]
+        _jobs[job_id] = {**job, 'updated': now}
+
+def _load_job(job_id: str) -> Optional[Dict[str, Any]]:
+    if _jobs_redis is not None:
+        data = _jobs_redis.get(f"job:{job_id}")
+        return None if data is None else _unpack_value(data)
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def _delete_job(job_id: str):
+    if _jobs_redis is not None:
+        _jobs_redis.delete(f"job:{job_id}")
+        return
+    with _jobs_lock:
+        _jobs.pop(job_id, None)
+
+def _run_job(job_id: str, job: Dict[str, Any], func: Callable, args: tuple):
+    """Run a background job and record its result or error where the polls read it"""
+    try:
+        job = {**job, 'status': 'done', 'result': func(*args)}
+    except Exception as e:
+        logger.exception("%s background job %s failed: %s", job['kind'], job_id, e)
+        job = {**job, 'status': 'failed', 'error': str(e), 'not_found': isinstance(e, FileNotFoundError)}
+    try:
+        _save_job(job_id, job)
+    except Exception as e:
+        # e.g. a result that cannot be stored; report it instead of leaving the job pending
+        logger.exception("Could not store the result of %s background job %s: %s", job['kind'], job_id, e)
+        _save_job(job_id, {**job, 'status': 'failed', 'result': None, 'error': str(e), 'not_found': False})
+
+def _wants_background_job() -> bool:
+    """Whether the client asked for the request to be processed as a background job"""
+    return request.values.get('async', '').lower() in ('1', 'true', 'yes')
+
+def _background_job_response(kind: str, func: Callable, *args):
+    """Submit func(*args) as a background job of the current session and respond with 202 and its job ID"""
+    job_id = uuid.uuid4().hex
+    job = {'kind': kind, 'owner': session.setdefault('_cache_id', uuid.uuid4().hex), 'status': 'pending'}
+    _save_job(job_id, job)
+    _job_executor.submit(_run_job, job_id, job, func, args)
+    logger.debug("Started %s background job %s", kind, job_id)
+    return jsonify({'status': 'accepted', 'job_id': job_id}), 202
+
+# How the result of each kind of job is stored in the session and returned
+_JOB_RESULT_HANDLERS = {
+    'agent2': _store_agent2_result,
+    'agent3': _store_agent3_result,
+}
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job = _load_job(job_id)
+    # Jobs are only visible to the session that started them
+    if job is None or job['owner'] != session.get('_cache_id'):
+        return jsonify({'status': 'error', 'message': f'Job {job_id} not found'}), 404
+    if job['status'] == 'pending':
+        return jsonify({'status': 'pending', 'job_id': job_id}), 202
+
+    if job['status'] == 'failed':
+        _delete_job(job_id)
+        if job['not_found']:
+            return jsonify({'status': 'error', 'message': f"Error: Input file not found. {job['error']}"}), 404
+        return jsonify({'status': 'error', 'message': f"An error occurred during processing: {job['error']}"}), 500
+    # The job is only removed once its result is stored, so a failing handler leaves it to be fetched again
+    response = _JOB_RESULT_HANDLERS[job['kind']](job['result'])
+    _delete_job(job_id)
+    return response
+
 @app.route('/api/agent3/review/<sys2_id>', methods=['GET'])
 def get_agent3_feedback(sys2_id):
     try:
@@ -1078,13 +1529,10 @@ def get_agent3_feedback(sys2_id):
         if not requirement:
             return jsonify({'status': 'error', 'message': f'Requirement {sys2_id} not found'}), 404
 
-        # Initialize review agent
-        review_agent = ReviewAgent()
-        
         # Get review feedback for this requirement
         feedback = review_agent.get_requirement_feedback(requirement)
         
-        return jsonify({
+        return fast_jsonify({
             'status': 'success',
             'review_status': feedback.get('status', 'Pending'),
             'suggestions': feedback.get('suggestions', []),
@@ -1109,12 +1557,6 @@ def export_sys2_specific_xlsx():
         # Define the specific fields to export
         fields_to_export = ['sys2_id', 'sys2_requirement']
 
-        # Call the export method with the specific fields and format
-        export_data_io = sys2_agent.export_requirements(sys2_requirements, 'xlsx', export_fields_list=fields_to_export)
-
-        if export_data_io is None:
-             return jsonify({'status': 'error', 'message': 'Failed to generate export data.'}), 500
-
         # Define the absolute path to save the file (updated to D: drive as requested)
         root_path = os.path.dirname(os.path.abspath(__file__))
         output_path = os.path.join(root_path, 'Inputs', 'sys2_requirements.xlsx')
@@ -1123,11 +1565,11 @@ def export_sys2_specific_xlsx():
         output_dir = os.path.dirname(output_path)
         os.makedirs(output_dir, exist_ok=True)
 
-        # Save the BytesIO content to the specified file path
-        with open(output_path, 'wb') as f:
-            f.write(export_data_io.getvalue())
+        # Call the export method with the specific fields and format; the workbook is written straight to the file
+        if sys2_agent.export_requirements(sys2_requirements, 'xlsx', export_fields_list=fields_to_export, output_path=output_path) is None:
+             return jsonify({'status': 'error', 'message': 'Failed to generate export data.'}), 500
 
-        print(f"[INFO] Successfully exported specific SYS.2 requirements to {output_path}")
+        logger.info("Successfully exported specific SYS.2 requirements to %s", output_path)
 
         return jsonify({
             'status': 'success',
@@ -1136,7 +1578,7 @@ def export_sys2_specific_xlsx():
         })
 
     except Exception as e:
-        print(f"[ERROR] Error exporting specific SYS.2 requirements: {e}")
+        logger.error("Error exporting specific SYS.2 requirements: %s", e)
         return jsonify({'status': 'error', 'message': f'Error exporting SYS.2 requirements: {str(e)}'}), 500
 
 @app.route('/api/agent2/save_sys2_xlsx', methods=['POST'])
@@ -1150,7 +1592,7 @@ def save_sys2_xlsx():
         sys2_requirements = session.get('sys2_requirements', [])
 
         if not sys2_requirements:
-            print("[DEBUG] save_sys2_xlsx: No SYS.2 requirements found in session to save.")
+            logger.debug("save_sys2_xlsx: No SYS.2 requirements found in session to save.")
             return jsonify({'status': 'error', 'message': 'No SYS.2 requirements found in session to save.'}), 400
 
         # Define the absolute path to save the file
@@ -1173,22 +1615,18 @@ def save_sys2_xlsx():
             'domain', 'priority', 'rationale', 'req_status'
         ]
 
-        # Call the export method to get the BytesIO object
+        # Call the export method to write the workbook straight to output_path
         # Passing None for export_fields_list uses the default fields defined inside the method
         # Or we can explicitly pass fields_to_export defined above
         # export_data_io = sys2_agent.export_requirements(sys2_requirements, 'xlsx', export_fields_list=None) # Use default fields
         # Pass the specific fields for the automatic export
-        export_data_io = sys2_agent.export_requirements(sys2_requirements, 'xlsx', export_fields_list=['sys2_id', 'sys2_requirement'])
+        exported_path = sys2_agent.export_requirements(sys2_requirements, 'xlsx', export_fields_list=['sys2_id', 'sys2_requirement'], output_path=output_path)
 
-        if export_data_io is None:
-            print("[DEBUG] save_sys2_xlsx: Failed to generate export data (export_data_io is None).")
+        if exported_path is None:
+            logger.debug("save_sys2_xlsx: Failed to generate export data (export_requirements returned None).")
             return jsonify({'status': 'error', 'message': 'Failed to generate export data.'}), 500
 
-        # Save the BytesIO content to the specified file path
-        with open(output_path, 'wb') as f:
-            f.write(export_data_io.getvalue())
-
-        print(f"[INFO] Successfully saved SYS.2 requirements to {output_path}")
+        logger.info("Successfully saved SYS.2 requirements to %s", output_path)
 
         return jsonify({
             'status': 'success',
@@ -1197,9 +1635,7 @@ def save_sys2_xlsx():
         })
 
     except Exception as e:
-        print(f"[ERROR] Error saving SYS.2 requirements to XLSX: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error saving SYS.2 requirements to XLSX: %s", e)
         return jsonify({'status': 'error', 'message': f'Error saving SYS.2 requirements to XLSX: {str(e)}'}), 500
 
 @app.route('/api/agent3/export_accepted', methods=['POST'])
@@ -1228,28 +1664,261 @@ def export_accepted_requirements():
             'message': str(e)
         }), 500
 
+# Agent 4 state. The generated test cases and requirements are the largest values an agent keeps per user,
+# so with the Redis session store they are kept under their own Redis keys (test cases in a hash keyed by
+# Test Case ID) instead of inside the session, which Flask-Session re-encodes and rewrites whenever it changes.
+# Without Redis they stay in the session under 'agent4_<name>'.
+AGENT4_STORE_TTL = int(os.getenv('AGENT4_STORE_TTL', str(24 * 3600)))  # Seconds the Redis keys live after a write
+
+# Field holding the ID of a generated test case (see TestGenAgent); test cases are stored and looked up by it
+TEST_CASE_ID_FIELD = 'Test Case ID'
+
+def _with_unique_test_case_ids(test_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The test cases with every Test Case ID made unique, so each one can be stored and updated by its ID.
+
+    Repeated or missing SYS.2 IDs give colliding Test Case IDs (e.g. 'TC-' for rows without an ID); later
+    occurrences get a -2, -3, ... suffix. Renamed test cases are copies, the given dicts are not changed.
+    """
+    seen = set()
+    unique = []
+    for position, tc in enumerate(test_cases, 1):
+        test_id = tc.get(TEST_CASE_ID_FIELD) or f"TC-{position}"
+        candidate, suffix = test_id, 2
+        while candidate in seen:
+            candidate = f"{test_id}-{suffix}"
+            suffix += 1
+        seen.add(candidate)
+        unique.append(tc if candidate == tc.get(TEST_CASE_ID_FIELD) else {**tc, TEST_CASE_ID_FIELD: candidate})
+    return unique
+
+class Agent4Store:
+    """Per-session Agent 4 data, in Redis when the session store is Redis and in the session otherwise"""
+
+    def __init__(self, redis_client=None, ttl: int = AGENT4_STORE_TTL):
+        self.redis = redis_client
+        self.ttl = ttl
+
+    def _key(self, name: str) -> str:
+        return f"agent4:{session.setdefault('_cache_id', uuid.uuid4().hex)}:{name}"
+
+    def get(self, name: str, default=None):
+        if self.redis is None:
+            return session.get('agent4_' + name, default)
+        data = self.redis.get(self._key(name))
+        return default if data is None else _unpack_value(data)
+
+    def set(self, name: str, value):
+        if self.redis is None:
+            session['agent4_' + name] = value
+            session.modified = True
+            return
+        self.redis.setex(self._key(name), self.ttl, _pack_value(value))
+
+    def get_many(self, defaults: Dict[str, Any]) -> Dict[str, Any]:
+        """Several stored values at once (name -> default); 'test_cases' may be among them.
+
+        In Redis the values and the test case order are fetched with a single MGET.
+        """
+        if self.redis is None:
+            return {name: self.get_test_cases() if name == 'test_cases' else session.get('agent4_' + name, default)
+                    for name, default in defaults.items()}
+        names = list(defaults)
+        keys = [self._key('test_case_ids' if name == 'test_cases' else name) for name in names]
+        values = {}
+        for name, data in zip(names, self.redis.mget(keys)):
+            if data is None:
+                values[name] = defaults[name]
+            elif name == 'test_cases':
+                records = self.redis.hmget(self._key('test_cases'), _unpack_value(data))
+                values[name] = [_unpack_value(record) for record in records if record is not None]
+            else:
+                values[name] = _unpack_value(data)
+        return values
+
+    def get_map(self, name: str) -> Dict[str, Any]:
+        """All entries of a dict stored with set_map_entry"""
+        if self.redis is None:
+            return session.get('agent4_' + name, {})
+        return {field.decode('utf-8'): _unpack_value(value)
+                for field, value in self.redis.hgetall(self._key(name)).items()}
+
+    def set_map_entry(self, name: str, field: str, value):
+        """Store one entry of a dict; in Redis only that field of the hash is written"""
+        if self.redis is None:
+            session.setdefault('agent4_' + name, {})[field] = value
+            session.modified = True
+            return
+        key = self._key(name)
+        pipe = self.redis.pipeline()
+        pipe.hset(key, field, _pack_value(value))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def get_test_cases(self) -> List[Dict[str, Any]]:
+        if self.redis is None:
+            return session.get('agent4_test_cases', [])
+        # The order of the test cases is kept next to the hash of the test cases themselves
+        order = self.redis.get(self._key('test_case_ids'))
+        if not order:
+            return []
+        records = self.redis.hmget(self._key('test_cases'), _unpack_value(order))
+        return [_unpack_value(record) for record in records if record is not None]
+
+    def set_test_cases(self, test_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store the test cases, replacing the previous ones; returns them as stored (with unique Test Case IDs)"""
+        test_cases = _with_unique_test_case_ids(test_cases)
+        self._touch_test_cases()
+        if self.redis is None:
+            session['agent4_test_cases'] = test_cases
+            # Position of each test case in the list, for O(1) updates by Test Case ID
+            session['agent4_test_cases_index'] = _build_index(test_cases, TEST_CASE_ID_FIELD)
+            session.modified = True
+            return test_cases
+        hash_key = self._key('test_cases')
+        order_key = self._key('test_case_ids')
+        pipe = self.redis.pipeline()
+        pipe.delete(hash_key)
+        if test_cases:
+            pipe.hset(hash_key, mapping={tc.get(TEST_CASE_ID_FIELD): _pack_value(tc) for tc in test_cases})
+            pipe.expire(hash_key, self.ttl)
+        pipe.setex(order_key, self.ttl, _pack_value([tc.get(TEST_CASE_ID_FIELD) for tc in test_cases]))
+        pipe.execute()
+        return test_cases
+
+    def _touch_test_cases(self):
+        """Give the stored test cases a new version, used as their ETag"""
+        self.set('test_cases_version', uuid.uuid4().hex)
+
+    def find_test_case(self, test_id: str):
+        """The stored test case with the given Test Case ID, or None"""
+        if self.redis is None:
+            test_cases = session.get('agent4_test_cases', [])
+            index = _find_indexed(test_cases, TEST_CASE_ID_FIELD, 'agent4_test_cases_index', test_id)
+            return None if index is None else test_cases[index]
+        record = self.redis.hget(self._key('test_cases'), test_id)
+        return None if record is None else _unpack_value(record)
+
+    def save_test_case(self, test_case: Dict[str, Any]):
+        """Persist a test case returned by find_test_case after it was changed"""
+        self._touch_test_cases()
+        if self.redis is None:
+            # The test case was updated in place inside the session list
+            session.modified = True
+            return
+        # Only this test case's field of the hash is rewritten
+        hash_key = self._key('test_cases')
+        pipe = self.redis.pipeline()
+        pipe.hset(hash_key, test_case.get(TEST_CASE_ID_FIELD), _pack_value(test_case))
+        pipe.expire(hash_key, self.ttl)
+        pipe.expire(self._key('test_case_ids'), self.ttl)
+        pipe.execute()
+
+agent4_store = Agent4Store(app.config.get('SESSION_REDIS') if Session is not None else None)
+
+# Requirements and generated test cases of recently loaded SYS.2 files, keyed by the file version (path, mtime,
+# size) or by a hash of the uploaded bytes, so loading an unchanged file again skips parsing and generation.
+# They are shared through Redis when the session store is Redis, and kept in a small in-process LRU otherwise.
+AGENT4_GENERATION_CACHE_TTL = 3600
+AGENT4_GENERATION_CACHE_SIZE = 16
+_agent4_generation_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_agent4_generation_cache_lock = threading.Lock()
+
+def _agent4_generate_cached(key: str, build: Callable[[], tuple]) -> tuple:
+    """Return (requirements, test_cases) for a cache key, calling build() to produce them on a miss"""
+    redis_client = agent4_store.redis
+    redis_key = 'agent4:generated:' + key
+    if redis_client is not None:
+        data = redis_client.get(redis_key)
+        if data is not None:
+            logger.debug("Reusing generated test cases for %s", key)
+            requirements, test_cases = _unpack_value(data)
+            return requirements, test_cases
+    else:
+        with _agent4_generation_cache_lock:
+            if key in _agent4_generation_cache:
+                _agent4_generation_cache.move_to_end(key)
+                logger.debug("Reusing generated test cases for %s", key)
+                return _agent4_generation_cache[key]
+
+    requirements, test_cases = build()
+    if redis_client is not None:
+        redis_client.setex(redis_key, AGENT4_GENERATION_CACHE_TTL, _pack_value([requirements, test_cases]))
+    else:
+        with _agent4_generation_cache_lock:
+            _agent4_generation_cache[key] = (requirements, test_cases)
+            if len(_agent4_generation_cache) > AGENT4_GENERATION_CACHE_SIZE:
+                _agent4_generation_cache.popitem(last=False)
+    return requirements, test_cases
+
+def _agent4_generate(file_path: str) -> tuple:
+    """Load the SYS.2 requirements of a file and generate their test cases"""
+    requirements = testgen_agent.load_requirements(file_path)
+    return requirements, testgen_agent.generate_test_cases(requirements)
+
+def _save_temp_upload(file) -> str:
+    """Save an uploaded SYS.2 file to a uniquely named temp file in the upload folder and return its path.
+
+    The extension is kept for the reader, and concurrent uploads of files with the same name do not
+    overwrite each other.
+    """
+    with tempfile.NamedTemporaryFile(dir=app.config['UPLOAD_FOLDER'], suffix=os.path.splitext(_upload_path(file.filename))[1],
+                                     delete=False, buffering=0) as temp_file:
+        shutil.copyfileobj(file.stream, temp_file, length=UPLOAD_COPY_CHUNK_SIZE)
+    return temp_file.name
+
+def _remove_temp_upload(temp_path: str):
+    """Remove a temp upload, together with the Feather sidecar written by the loader"""
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+    remove_sidecars(temp_path)
+
+def _agent4_generate_upload(cache_key: str, temp_path: str) -> tuple:
+    """Generate (or reuse) the test cases of a saved upload; the temp file is removed afterwards, even on failure"""
+    try:
+        return _agent4_generate_cached(cache_key, lambda: _agent4_generate(temp_path))
+    finally:
+        _remove_temp_upload(temp_path)
+
+def _store_agent4_result(result: tuple):
+    """Store generated requirements and test cases for this session and build the response"""
+    requirements, test_cases = result
+    agent4_store.set('requirements', requirements)
+    test_cases = agent4_store.set_test_cases(test_cases)
+    return negotiated_response({'status': 'success', 'test_cases': test_cases})
+
+# Agent 4 generation can also run as a background job (async=1), collected through /api/jobs/<job_id>
+_JOB_RESULT_HANDLERS['agent4'] = _store_agent4_result
+
+# Parts of the Agent 4 dashboard data and their value when nothing is stored yet
+AGENT4_DASHBOARD_FIELDS = MappingProxyType({
+    'test_cases': [],
+    'traceability_matrix': {},
+    'coverage_analysis': {},
+    'maturity_status': {},
+    'requirements': [],
+})
+
 @app.route('/agent4/dashboard_data', methods=['GET'])
 def get_dashboard_data():
     """Provide data for Agent 4 dashboard charts and tables"""
     try:
-        # Retrieve data from session
-        test_cases = session.get('agent4_test_cases', [])
-        traceability_matrix = session.get('agent4_traceability_matrix', {})
-        coverage_analysis = session.get('agent4_coverage_analysis', {})
-        maturity_status = session.get('agent4_maturity_status', {})
-        requirements = session.get('agent4_requirements', [])
-        
-        if not test_cases and not requirements:
+        # Only the parts named in ?fields=a,b are loaded and returned (all of them by default)
+        requested = request.args.get('fields')
+        if requested:
+            requested_fields = {field.strip() for field in requested.split(',')}
+            fields = {name: default for name, default in AGENT4_DASHBOARD_FIELDS.items() if name in requested_fields}
+        else:
+            fields = AGENT4_DASHBOARD_FIELDS
+
+        # Retrieve the data in one batch
+        data = agent4_store.get_many(fields)
+
+        if ('test_cases' in data or 'requirements' in data) and not data.get('test_cases') and not data.get('requirements'):
             return jsonify({'status': 'info', 'message': 'No data available. Generate test cases first.'}), 200
-        
-        return jsonify({
-            'status': 'success',
-            'test_cases': test_cases,
-            'traceability_matrix': traceability_matrix,
-            'coverage_analysis': coverage_analysis,
-            'maturity_status': maturity_status,
-            'requirements': requirements
-        })
+
+        return negotiated_response({'status': 'success', **data})
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -1267,29 +1936,23 @@ def update_test_case():
         if not test_case_id_to_update or not updates:
             return jsonify({'status': 'error', 'message': 'Missing test_case_id or updates'}), 400
 
-        # Load test cases from session
-        test_cases = session.get('agent4_test_cases', [])
-        updated_test_case = None
-        
         # Find and update the test case
-        for tc in test_cases:
-            if tc.get('test_id') == test_case_id_to_update:
-                for field, value in updates.items():
-                    # Handle specific fields that might need list conversion (Steps, Expected Results)
-                    if field in ['steps', 'expected_results'] and isinstance(value, str):
-                         # Convert newline-separated string back to list
-                        tc[field] = [item.strip() for item in value.split('\n') if item.strip()]
-                    else:
-                        tc[field] = value
-                updated_test_case = tc
-                break
-
+        updated_test_case = agent4_store.find_test_case(test_case_id_to_update)
         if updated_test_case:
-            # Save the updated list back to session
-            session['agent4_test_cases'] = test_cases
-            session.modified = True # Mark session as modified
-            
-            return jsonify({
+            changed = False
+            for field, value in updates.items():
+                # Handle specific fields that might need list conversion (Steps, Expected Results)
+                if field in ['steps', 'expected_results'] and isinstance(value, str):
+                     # Convert newline-separated string back to list, dropping blank lines
+                    value = [item for item in map(str.strip, value.splitlines()) if item]
+                if updated_test_case.get(field) != value:
+                    updated_test_case[field] = value
+                    changed = True
+            # Save only the updated test case; no-op updates (e.g. editor autosaves) leave the store untouched
+            if changed:
+                agent4_store.save_test_case(updated_test_case)
+
+            return negotiated_response({
                 'status': 'success',
                 'message': f'Test case {test_case_id_to_update} updated successfully.',
                 'updated_test_case': updated_test_case # Return the updated test case
@@ -1298,7 +1961,7 @@ def update_test_case():
             return jsonify({'status': 'error', 'message': f'Test case with ID {test_case_id_to_update} not found.'}), 404
 
     except Exception as e:
-        print(f"Error updating test case: {e}")
+        logger.error("Error updating test case: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/agent4/submit_correction', methods=['POST'])
@@ -1312,17 +1975,10 @@ def submit_correction():
         if not test_case_id or not corrected_data:
             return jsonify({'status': 'error', 'message': 'Missing test_case_id or corrected_data'}), 400
 
-        # Load existing corrections from session, or initialize if none exist
-        corrections = session.get('agent4_corrections', {})
-
-        # Store the corrected data for the specific test case ID
-        corrections[test_case_id] = corrected_data
+        # Store the corrected data for the specific test case ID (without rewriting the other corrections)
+        agent4_store.set_map_entry('corrections', test_case_id, corrected_data)
 
-        # Save the updated corrections back to session
-        session['agent4_corrections'] = corrections
-        session.modified = True # Mark session as modified
-
-        print(f"[INFO] Received and stored correction for test case: {test_case_id}")
+        logger.info("Received and stored correction for test case: %s", test_case_id)
         # print(f"[DEBUG] Stored corrections: {corrections}") # Optional: log full corrections
 
         return jsonify({
@@ -1331,7 +1987,7 @@ def submit_correction():
         })
 
     except Exception as e:
-        print(f"[ERROR] Error submitting correction: {e}")
+        logger.error("Error submitting correction: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/api/agent4/load_sys2', methods=['GET'])
@@ -1339,12 +1995,12 @@ def agent4_load_sys2():
     """Auto-load sys2_requirements_reviewed.xlsx and generate test cases."""
     try:
         file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Inputs', 'sys2_requirements_reviewed.xlsx')
-        requirements = testgen_agent.load_requirements(file_path)
-        test_cases = testgen_agent.generate_test_cases(requirements)
-        session['agent4_requirements'] = requirements
-        session['agent4_test_cases'] = test_cases
-        session.modified = True
-        return jsonify({'status': 'success', 'test_cases': test_cases})
+        # Keyed by the file version, so the test cases are only generated again after the file changes
+        stat = os.stat(file_path)
+        cache_key = f"file:{os.path.abspath(file_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        if _wants_background_job():
+            return _background_job_response('agent4', _agent4_generate_cached, cache_key, lambda: _agent4_generate(file_path))
+        return _store_agent4_result(_agent4_generate_cached(cache_key, lambda: _agent4_generate(file_path)))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
@@ -1355,30 +2011,70 @@ def agent4_upload_sys2():
         file = request.files.get('file')
         if not file or file.filename == '':
             return jsonify({'status': 'error', 'message': 'No file uploaded.'}), 400
-        # Save to a temp location
-        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(temp_path)
-        requirements = testgen_agent.load_requirements(temp_path)
-        test_cases = testgen_agent.generate_test_cases(requirements)
-        session['agent4_requirements'] = requirements
-        session['agent4_test_cases'] = test_cases
-        session.modified = True
-        os.remove(temp_path)
-        return jsonify({'status': 'success', 'test_cases': test_cases})
+        # Keyed by the uploaded bytes, so uploading the same file again reuses its test cases
+        digest = hashlib.blake2b()
+        for chunk in iter(lambda: file.stream.read(UPLOAD_COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        file.stream.seek(0)
+        cache_key = 'upload:' + digest.hexdigest()
+
+        if _wants_background_job():
+            # The request stream is gone once the response is sent, so the upload is saved before the job starts
+            return _background_job_response('agent4', _agent4_generate_upload, cache_key, _save_temp_upload(file))
+
+        def generate():
+            temp_path = _save_temp_upload(file)
+            try:
+                return _agent4_generate(temp_path)
+            finally:
+                _remove_temp_upload(temp_path)
+
+        return _store_agent4_result(_agent4_generate_cached(cache_key, generate))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
 @app.route('/api/agent4/test_cases', methods=['GET'])
 def agent4_get_test_cases():
     """Return generated test cases as JSON."""
-    test_cases = session.get('agent4_test_cases', [])
-    return jsonify({'status': 'success', 'test_cases': test_cases})
+    # The ETag changes whenever the test cases are stored or edited (and differs per response format), so a
+    # client polling with If-None-Match gets an empty 304 until something changes
+    version = agent4_store.get('test_cases_version')
+    etag = f"{version}-{'msgpack' if _prefers_msgpack() else 'json'}" if version else None
+    # Flask-Compress appends the encoding to the ETag of compressed responses ("<etag>:br", "<etag>:gzip"),
+    # which is the form clients send back
+    if etag and (request.if_none_match.star_tag or
+                 any(tag.split(':', 1)[0] == etag for tag in request.if_none_match.as_set(include_weak=True))):
+        response = Response(status=304)
+    else:
+        test_cases = agent4_store.get_test_cases()
+        response = negotiated_response({'status': 'success', 'test_cases': test_cases})
+    if etag:
+        response.set_etag(etag)
+    response.vary.add('Accept')
+    return response
+
+BROWSER_WAIT_TIMEOUT = 10 # Seconds to wait for the server to accept connections before opening the browser anyway
 
 def open_browser():
-    time.sleep(1) # Give the server a moment to start
+    # Poll the port until the server is listening instead of sleeping a fixed time
+    deadline = time.monotonic() + BROWSER_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('localhost', 5000), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.02)
     webbrowser.open('http://localhost:5000/')
 
 if __name__ == '__main__':
-    # Open browser in a separate thread after a short delay
-    threading.Thread(target=open_browser).start()
-    app.run(debug=True) 
\ No newline at end of file
+    # Open browser in a separate thread once the server is up (OPEN_BROWSER=0 turns it off); skipped in the
+    # reloader's child process so only one browser window is opened
+    if os.getenv('OPEN_BROWSER', '1') == '1' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        threading.Thread(target=open_browser, daemon=True).start()
+    if os.getenv('WHALE_SERVER', '').lower() == 'waitress':
+        # Multi-threaded production server, without the debugger and the reloader process
+        from waitress import serve
+        serve(app, host=os.getenv('HOST', '127.0.0.1'), port=5000, threads=int(os.getenv('WAITRESS_THREADS', '8')))
+    else:
+        # Development server; FLASK_DEBUG=0 turns off the debugger and the reloader
+        app.run(debug=os.getenv('FLASK_DEBUG', '1') == '1')